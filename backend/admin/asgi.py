@@ -2,6 +2,14 @@
 ASGI config for admin project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is the supported way to serve the project (e.g.
+``uvicorn admin.asgi:application``):
+
+* the order status stream (/api/orders/order/status-stream/) keeps idle
+  connections open without holding a worker thread. Under WSGI or runserver
+  it answers 501, since Django would buffer the endless stream.
+* the admin order export and ?stream=true pending queue send their rows in
+  batches as they are read (core.utils.streaming.BatchedStreamingHttpResponse).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -81,6 +81,52 @@ DATABASES = {
     }
 }
 
+# Cache
+# Local memory by default; set CACHE_BACKEND/CACHE_LOCATION to share the catalog
+# cache between workers (e.g. django.core.cache.backends.filebased.FileBasedCache).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'pratikstore-cache'),
+        'OPTIONS': {
+            # Holds catalog payloads and a token_version key per active user
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
+    }
+}
+
+# Rendered catalog payloads, invalidated by the catalog version counter
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 300))
+
+# Product search (Postgres tsvector + trigram; in-process index on other databases)
+PRODUCT_SEARCH_CONFIG = 'english'
+PRODUCT_SEARCH_TRIGRAM_THRESHOLD = 0.3
+
+# Lower bounds of the price facet buckets; the last bucket is open-ended
+PRODUCT_PRICE_BUCKETS = [0, 500, 1000, 2500, 5000]
+
+# Upper bound for ?preview=N on the category list
+CATEGORY_PREVIEW_MAX = 20
+
+# Order numbers reserved per process at a time (see orders.numbering)
+ORDER_NUMBER_BLOCK_SIZE = int(os.getenv('ORDER_NUMBER_BLOCK_SIZE', 20))
+
+# How long a pending_verification order holds its stock before the
+# expire_reservations sweeper cancels it
+ORDER_RESERVATION_TTL = timedelta(minutes=int(os.getenv('ORDER_RESERVATION_TTL_MINUTES', 60)))
+
+# Stored responses for Idempotency-Key headers on order creation are
+# replayed for this long, then removed by purge_idempotency_keys
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24)))
+
+# Seconds between keepalive comments on idle order status streams (SSE)
+ORDER_EVENTS_KEEPALIVE = int(os.getenv('ORDER_EVENTS_KEEPALIVE', 15))
+
+# Admin dashboard: default range in days and how long computed stats are cached
+DASHBOARD_DEFAULT_DAYS = 30
+DASHBOARD_STATS_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_STATS_CACHE_TIMEOUT', 60))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -116,7 +162,8 @@ AUTH_USER_MODEL = 'adminpanel.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # request.user built from token claims, see adminpanel.authentication
+        'adminpanel.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
@@ -134,7 +181,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=10),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # last_login is written behind by adminpanel.last_login instead
+    'UPDATE_LAST_LOGIN': False,
     # Custom settings for cookie names
     'AUTH_COOKIE': 'access',  # Could be used for access token if you wanted
     'AUTH_COOKIE_REFRESH': 'refresh', # Name for the refresh token cookie
@@ -145,8 +193,29 @@ SIMPLE_JWT = {
     'AUTH_COOKIE_SAMESITE': 'Lax', # Or 'Strict'
     'ALGORITHM': 'HS256',  # Keep using HS256
     'SIGNING_KEY': SECRET_KEY,  # You're already using your secret key
+    # Check the blacklist through the per-process revocation set (adminpanel.revocation)
+    'TOKEN_REFRESH_SERIALIZER': 'adminpanel.revocation.CachedTokenRefreshSerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'adminpanel.revocation.CachedTokenBlacklistSerializer',
 }
 
+# Revoked refresh-token JTIs are polled from the blacklist at most this often
+# (seconds); the set is rebuilt from unexpired tokens every RELOAD_INTERVAL
+TOKEN_REVOCATION_SYNC_INTERVAL = float(os.getenv('TOKEN_REVOCATION_SYNC_INTERVAL', 1))
+TOKEN_REVOCATION_RELOAD_INTERVAL = int(os.getenv('TOKEN_REVOCATION_RELOAD_INTERVAL', 3600))
+# Ids below the highest seen that each sync reads again, for rows that commit out of id order
+TOKEN_REVOCATION_SYNC_OVERLAP = int(os.getenv('TOKEN_REVOCATION_SYNC_OVERLAP', 200))
+# Users' token versions are cached this long; with a per-process cache this is
+# how long a revoked access token can still be accepted by other workers
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', 60))
+# Login timestamps are buffered and written to User.last_login in one batch per
+# window, so each process writes a user's row at most once per window
+LAST_LOGIN_WRITE_WINDOW = int(os.getenv('LAST_LOGIN_WRITE_WINDOW', 60))
+
+# How long expired rows are kept before `manage.py prune_expired` deletes them
+TOKEN_RETENTION = timedelta(days=int(os.getenv('TOKEN_RETENTION_DAYS', 1)))
+PASSWORD_RESET_RETENTION = timedelta(days=int(os.getenv('PASSWORD_RESET_RETENTION_DAYS', 7)))
+OTP_RETENTION = timedelta(days=int(os.getenv('OTP_RETENTION_DAYS', 1)))
+
 
 
 SPECTACULAR_SETTINGS = {
@@ -180,6 +249,15 @@ SUPPORT_EMAIL = os.getenv('SUPPORT_EMAIL', 'support@yourdomain.com')
 SITE_NAME = os.getenv('SITE_NAME', 'Pratik Store')
 ADMIN_BASE_URL = os.getenv('ADMIN_BASE_URL', 'http://localhost:8000/admin')
 
+# Transactional email outbox (sent by `manage.py dispatch_outbox --loop`)
+EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', 'True') == 'True'
+# Backend used by the dispatcher; defaults to EMAIL_BACKEND. Use
+# django.core.mail.backends.filebased.EmailBackend as a local SMTP stand-in.
+EMAIL_OUTBOX_BACKEND = os.getenv('EMAIL_OUTBOX_BACKEND')
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv('EMAIL_OUTBOX_RETRY_DELAY', 30))  # seconds, doubled per attempt
+
 
 
 CSRF_TRUSTED_ORIGINS = CORS_ALLOWED_ORIGINS.copy()
@@ -193,6 +271,9 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Background threads that build product image renditions (0 = build inline)
+PRODUCT_IMAGE_WORKERS = int(os.getenv('PRODUCT_IMAGE_WORKERS', 2))
+
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
     SECURE_HSTS_SECONDS = 31536000  # 1 year
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from adminpanel.rollups import record_status_changes
+from core.outbox import enqueue_emails
+from orders.events import publish_order_statuses
+from orders.models import Order, Payment
+
+# Admin decision -> payment status it implies
+PAYMENT_STATUS_FOR = {
+    'confirmed': 'verified',
+    'cancelled': 'failed',
+}
+
+
+def build_status_email(order, new_status, admin_notes=''):
+    """enqueue_email arguments for the customer's order status update email."""
+    context = {
+        'order': order,
+        'status': new_status,
+        'admin_notes': admin_notes,
+        'order_url': f'{settings.FRONTEND_URL}/orders/{order.order_number}'
+    }
+    html_message = render_to_string('emails/order_status_update.html', context)
+    return {
+        'subject': f'Order {order.order_number} {new_status}',
+        'body': strip_tags(html_message),
+        'recipients': [order.user.email],
+        'html_message': html_message,
+    }
+
+
+def bulk_update_order_status(decisions):
+    """
+    Apply {order_number: (new_status, admin_notes)} in one transaction with a
+    constant number of queries: lock the orders still in processing, one
+    conditional UPDATE per target status for orders and payments, one INSERT
+    for all notification emails and one NOTIFY batch for status streams.
+    Returns {order_number: current status} for the orders that were not
+    processing (missing orders are absent) and the list of updated orders.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        locked = dict(
+            Order.objects.select_for_update()
+            .filter(order_number__in=decisions, status='processing')
+            .order_by('id')
+            .values_list('order_number', 'id')
+        )
+
+        ids_by_status = defaultdict(list)
+        for order_number, order_id in locked.items():
+            ids_by_status[decisions[order_number][0]].append(order_id)
+        for new_status, ids in ids_by_status.items():
+            Order.objects.filter(id__in=ids, status='processing').update(status=new_status, updated_at=now)
+            Payment.objects.filter(order_id__in=ids).update(status=PAYMENT_STATUS_FOR[new_status], updated_at=now)
+
+        updated = list(Order.objects.filter(id__in=locked.values()).select_related('user'))
+        record_status_changes(updated, 'processing')
+        enqueue_emails([
+            build_status_email(order, order.status, decisions[order.order_number][1])
+            for order in updated
+        ])
+        publish_order_statuses(updated)
+
+    skipped = dict(
+        Order.objects.filter(order_number__in=set(decisions) - set(locked))
+        .values_list('order_number', 'status')
+    )
+    return updated, skipped
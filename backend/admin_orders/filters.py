@@ -0,0 +1,98 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import serializers
+
+from core.utils.params import parse_datetime_param
+from orders.models import Order, Payment
+
+PAYMENT_METHODS = [choice[0] for choice in Payment.PAYMENT_METHODS]
+ORDER_STATUSES = [choice[0] for choice in Order.ORDER_STATUS]
+# Shorter email fragments can't use the trigram index and would scan every user
+MIN_EMAIL_SEARCH_LENGTH = 3
+
+
+def parse_order_filters(params):
+    """Validate ?payment_method=&created_from=&created_to=&min_amount=&max_amount= into a dict."""
+    filters = {}
+
+    payment_method = params.get('payment_method')
+    if payment_method:
+        if payment_method not in PAYMENT_METHODS:
+            raise serializers.ValidationError({'payment_method': f'Expected one of {PAYMENT_METHODS}.'})
+        filters['payment_method'] = payment_method
+
+    if params.get('created_from'):
+        filters['created_from'] = parse_datetime_param('created_from', params['created_from'])
+    if params.get('created_to'):
+        filters['created_to'] = parse_datetime_param('created_to', params['created_to'], end_of_day=True)
+
+    for name in ('min_amount', 'max_amount'):
+        value = params.get(name)
+        if value:
+            try:
+                filters[name] = Decimal(value)
+            except InvalidOperation:
+                raise serializers.ValidationError({name: 'Expected a number.'})
+            # Decimal() also accepts NaN and Infinity, which the database can't compare
+            if not filters[name].is_finite():
+                raise serializers.ValidationError({name: 'Expected a number.'})
+
+    return filters
+
+
+def filter_orders(queryset, filters):
+    if 'payment_method' in filters:
+        queryset = queryset.filter(payment__payment_method=filters['payment_method'])
+    if 'created_from' in filters:
+        queryset = queryset.filter(created_at__gte=filters['created_from'])
+    if 'created_to' in filters:
+        queryset = queryset.filter(created_at__lte=filters['created_to'])
+    if 'min_amount' in filters:
+        queryset = queryset.filter(total_amount__gte=filters['min_amount'])
+    if 'max_amount' in filters:
+        queryset = queryset.filter(total_amount__lte=filters['max_amount'])
+    return queryset
+
+
+def parse_search_filters(params):
+    """parse_order_filters plus the search lookups: ?email=&utr=&order_number=&status=."""
+    filters = parse_order_filters(params)
+
+    email = params.get('email', '').strip()
+    if email:
+        if len(email) < MIN_EMAIL_SEARCH_LENGTH:
+            raise serializers.ValidationError(
+                {'email': f'Enter at least {MIN_EMAIL_SEARCH_LENGTH} characters.'}
+            )
+        filters['email'] = email
+
+    for name in ('utr', 'order_number'):
+        value = params.get(name, '').strip()
+        if value:
+            filters[name] = value
+
+    order_status = params.get('status')
+    if order_status:
+        if order_status not in ORDER_STATUSES:
+            raise serializers.ValidationError({'status': f'Expected one of {ORDER_STATUSES}.'})
+        filters['status'] = order_status
+
+    return filters
+
+
+def search_orders(queryset, filters):
+    """
+    Each lookup is shaped to hit its index: email substring via the trigram
+    index on UPPER(email), exact UTR via btree, order number prefix via the
+    pattern-ops index Django keeps for unique CharFields.
+    """
+    queryset = filter_orders(queryset, filters)
+    if 'email' in filters:
+        queryset = queryset.filter(user__email__icontains=filters['email'])
+    if 'utr' in filters:
+        queryset = queryset.filter(payment__utr_number=filters['utr'])
+    if 'order_number' in filters:
+        queryset = queryset.filter(order_number__startswith=filters['order_number'].upper())
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    return queryset
@@ -0,0 +1,15 @@
+from core.utils.pagination import KeysetPagination
+
+
+class PendingOrdersPagination(KeysetPagination):
+    """Oldest first, so the verification queue is worked in arrival order."""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('created_at', 'id')
+
+
+class OrderSearchPagination(KeysetPagination):
+    """Newest matches first."""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
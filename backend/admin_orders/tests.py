@@ -1,3 +1,221 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import warnings
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from adminpanel.models import User
+from core.models import OutboundEmail
+from orders.models import Order, OrderItem, Payment
+from orders.tests import create_customer
+from .views import AdminOrderExportView
+
+
+def read_async(response):
+    """Consume a streaming response the way the ASGI handler does."""
+    async def consume():
+        return [part async for part in response.__aiter__()]
+
+    # Django warns when it has to buffer a sync iterator for ASGI
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        return b''.join(async_to_sync(consume)()).decode()
+
+
+class AdminOrdersTestCase(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', 'password', is_active=True, is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.customer, self.address = create_customer(0)
+
+    def create_pending_orders(self, count, method='upi', amount=100):
+        start = Order.objects.count()
+        orders = Order.objects.bulk_create([
+            Order(
+                user=self.customer, order_number=f'ORD20250101{start + i:06d}',
+                total_amount=amount, status='processing', shipping_address=self.address,
+            )
+            for i in range(count)
+        ])
+        Payment.objects.bulk_create([
+            Payment(order=order, payment_method=method, amount=amount) for order in orders
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_name='Mug', product_price=amount, quantity=1, total_price=amount)
+            for order in orders
+        ])
+        return orders
+
+
+class AdminPendingOrdersTests(AdminOrdersTestCase):
+    def test_pages_are_keyset_paginated_with_flat_query_count(self):
+        self.create_pending_orders(30)
+        seen = []
+        params = {'page_size': 20}
+        while True:
+            with self.assertNumQueries(2):
+                data = self.client.get('/api/admin/orders/manage/pending/', params).data
+            seen += [order['order_number'] for order in data['results']]
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_filters(self):
+        self.create_pending_orders(3, method='upi', amount=100)
+        self.create_pending_orders(2, method='bank_transfer', amount=900)
+        url = '/api/admin/orders/manage/pending/'
+
+        self.assertEqual(len(self.client.get(url, {'payment_method': 'bank_transfer'}).data['results']), 2)
+        self.assertEqual(len(self.client.get(url, {'min_amount': '500'}).data['results']), 2)
+        self.assertEqual(len(self.client.get(url, {'max_amount': '500'}).data['results']), 3)
+        self.assertEqual(len(self.client.get(url, {'created_to': '2000-01-01'}).data['results']), 0)
+        self.assertEqual(self.client.get(url, {'payment_method': 'cash'}).status_code, 400)
+        for value in ('NaN', 'Infinity', 'x'):
+            self.assertEqual(self.client.get(url, {'min_amount': value}).status_code, 400)
+        for value in ('2024-02-30', '2024-13-01T10:00:00', 'yesterday'):
+            response = self.client.get(url, {'created_from': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('created_from', response.data)
+
+    def test_stream_returns_every_order_as_ndjson(self):
+        self.create_pending_orders(7)
+        response = self.client.get('/api/admin/orders/manage/pending/', {'stream': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        orders = [json.loads(line) for line in lines]
+        self.assertEqual(len(orders), 7)
+        self.assertEqual(orders[0]['items'][0]['product_name'], 'Mug')
+
+    def test_stream_under_asgi(self):
+        self.create_pending_orders(3)
+        response = self.client.get('/api/admin/orders/manage/pending/', {'stream': 'true'})
+        self.assertEqual(len(read_async(response).splitlines()), 3)
+
+
+@override_settings(EMAIL_OUTBOX_ENABLED=True)
+class AdminBulkUpdateOrderStatusTests(AdminOrdersTestCase):
+    url = '/api/admin/orders/manage/bulk-status/'
+
+    def bulk_update(self, orders):
+        decisions = [
+            {'order_number': order.order_number, 'status': 'confirmed' if i % 5 else 'cancelled'}
+            for i, order in enumerate(orders)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'orders': decisions}, format='json')
+        self.assertEqual((response.data['updated'], response.data['failed']), (len(orders), 0))
+        return len(queries)
+
+    def test_bulk_update_in_constant_queries(self):
+        small_batch = self.bulk_update(self.create_pending_orders(10))
+        self.assertEqual(self.bulk_update(self.create_pending_orders(50)), small_batch)
+
+        self.assertEqual(Order.objects.filter(status='confirmed').count(), 48)
+        self.assertEqual(Payment.objects.filter(status='failed').count(), 12)
+        self.assertEqual(OutboundEmail.objects.count(), 60)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_per_order_outcomes(self):
+        pending, already_done = self.create_pending_orders(2)
+        Order.objects.filter(pk=already_done.pk).update(status='confirmed')
+        response = self.client.post(self.url, {'orders': [
+            {'order_number': pending.order_number, 'status': 'confirmed', 'admin_notes': 'UTR matched'},
+            {'order_number': already_done.order_number, 'status': 'cancelled'},
+            {'order_number': 'ORD-missing', 'status': 'confirmed'},
+            {'order_number': pending.order_number + 'x', 'status': 'shipped'},
+            {'order_number': ['x'], 'status': 'confirmed'},
+            {'status': 'confirmed'},
+            'not an object',
+            {'order_number': 'ORD-other', 'status': ['confirmed']},
+            {'order_number': 'ORD-notes', 'status': 'confirmed', 'admin_notes': {'a': 1}},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        results = response.data['results']
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(results[0], {'order_number': pending.order_number, 'updated': True, 'new_status': 'confirmed'})
+        self.assertEqual(results[1]['current_status'], 'confirmed')
+        self.assertEqual(results[2]['error'], 'Order not found')
+        self.assertIn('Status must be', results[3]['error'])
+        self.assertEqual([result['error'] for result in results[4:7]], ['order_number must be a non-empty string'] * 3)
+        self.assertEqual(results[4]['order_number'], ['x'])
+        self.assertIn('Status must be', results[7]['error'])
+        self.assertEqual(results[8]['error'], 'admin_notes must be a string')
+        self.assertEqual(response.data['failed'], 8)
+        self.assertIn('UTR matched', OutboundEmail.objects.get().html_body)
+
+    def test_rejects_empty_and_non_admin_requests(self):
+        self.assertEqual(self.client.post(self.url, {'orders': []}, format='json').status_code, 400)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.post(self.url, {'orders': []}, format='json').status_code, 403)
+
+
+class AdminOrderSearchTests(AdminOrdersTestCase):
+    url = '/api/admin/orders/manage/search/'
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [order['order_number'] for order in response.data['results']]
+
+    def test_lookups(self):
+        first, second = self.create_pending_orders(2)
+        Payment.objects.filter(order=first).update(utr_number='UTR123456')
+        other, _ = create_customer(1)
+        Order.objects.filter(pk=second.pk).update(user=other, total_amount=999)
+
+        self.assertEqual(self.search(email='OMER1@EXAMPLE'), [second.order_number])
+        self.assertEqual(self.search(utr='UTR123456'), [first.order_number])
+        self.assertEqual(self.search(order_number=first.order_number[:-1].lower()), [second.order_number, first.order_number])
+        self.assertEqual(self.search(min_amount='500'), [second.order_number])
+        self.assertEqual(self.search(status='processing', email='customer0'), [first.order_number])
+
+    def test_requires_a_usable_filter(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'email': 'ab'}).status_code, 400)
+
+
+class AdminOrderExportTests(AdminOrdersTestCase):
+    url = '/api/admin/orders/manage/export/'
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_one_row_per_item(self):
+        orders = self.create_pending_orders(3)
+        OrderItem.objects.create(order=orders[0], product_name='Plate', product_price=5, quantity=2)
+
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['customer_email'], 'customer0@example.com')
+        self.assertEqual({row['product_name'] for row in rows if row['order_number'] == orders[0].order_number}, {'Mug', 'Plate'})
+
+    def test_ndjson_with_filters(self):
+        first, second = self.create_pending_orders(2)
+        Order.objects.filter(pk=second.pk).update(status='confirmed')
+
+        lines = [json.loads(line) for line in self.export(type='ndjson', status='confirmed').splitlines()]
+        self.assertEqual([line['order_number'] for line in lines], [second.order_number])
+        self.assertEqual(lines[0]['payment_method'], 'upi')
+        self.assertEqual(self.export(type='ndjson', created_to='2000-01-01'), '')
+        self.assertEqual(self.client.get(self.url, {'type': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'max_amount': 'Infinity'}).status_code, 400)
+
+    def test_export_under_asgi(self):
+        self.create_pending_orders(3)
+        with patch.object(AdminOrderExportView, 'chunk_size', 2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(read_async(response))))
+        self.assertEqual(len(rows), 3)
@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [  # You're missing this line!
     path('manage/pending/', views.AdminPendingOrdersView.as_view(), name='admin-pending-orders'),
+    path('manage/export/', views.AdminOrderExportView.as_view(), name='admin-order-export'),
+    path('manage/search/', views.AdminOrderSearchView.as_view(), name='admin-order-search'),
+    path('manage/bulk-status/', views.AdminBulkUpdateOrderStatusView.as_view(), name='admin-bulk-update-order-status'),
     path('manage/<str:order_number>/', views.AdminOrderDetailView.as_view(), name='admin-order-detail'),
     path('manage/<str:order_number>/status/', views.AdminUpdateOrderStatusView.as_view(), name='admin-update-order-status'),
     path('manage/', views.AdminOrdersByStatusView.as_view(), name='admin-orders-by-status'),
@@ -1,11 +1,12 @@
-from django.core.mail import send_mail
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+import csv
+import itertools
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from django.db.models import Q
+from django.utils import timezone
 
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
@@ -13,63 +14,83 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
 from orders.models import Order, OrderItem, Payment
+from orders.events import publish_order_status
+from core.outbox import enqueue_email
+from core.utils.streaming import BatchedStreamingHttpResponse
+from .bulk import PAYMENT_STATUS_FOR, build_status_email, bulk_update_order_status
+from .filters import filter_orders, parse_order_filters, parse_search_filters, search_orders
+from .pagination import OrderSearchPagination, PendingOrdersPagination
+
+def serialize_pending_order(order):
+    return {
+        'order_number': order.order_number,
+        'user': {
+            'email': order.user.email,
+            # 'phone': order.user.phone_number,  # Add phone field to your User model
+            'name': order.user.username
+        },
+        'shipping_address': {
+            'street': order.shipping_address.street,
+            'city': order.shipping_address.city,
+            'state': order.shipping_address.state,
+            'zip_code': order.shipping_address.zip_code,
+            # 'country': order.shipping_address.country,
+            'phone' : order.shipping_address.phone
+        } if order.shipping_address else None,
+        'payment': {
+            'method': order.payment.get_payment_method_display(),
+            'amount': float(order.payment.amount),
+            'utr_number': order.payment.utr_number,
+            'payment_date': order.payment.payment_date,
+            'transaction_ss': order.payment.transaction_ss.url if order.payment.transaction_ss else None
+        },
+        'items': [{
+            'product_name': item.product_name,
+            'quantity': item.quantity,
+            'price': float(item.product_price),
+            'total': float(item.total_price)
+        } for item in order.items.all()],
+        'total_amount': float(order.total_amount),
+        'created_at': order.created_at
+    }
 
 class AdminPendingOrdersView(APIView):
     permission_classes = [IsAuthenticated]
     serialiser_class = None
+    pagination_class = PendingOrdersPagination
+    stream_chunk_size = 500
     
     def get(self, request):
-        """Get all orders pending verification (admin only)"""
+        """
+        Get orders awaiting payment verification (admin only), oldest first.
+        Cursor-paginated; ?stream=true streams every match as NDJSON instead.
+        """
         if not request.user.is_admin:
             return Response(
                 {'error': 'Admin access required'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        pending_orders = (
-            Order.objects.filter(
-                 Q(status='processing')
-            )
-            .select_related('user', 'shipping_address', 'payment')
-            .prefetch_related('items')
+        pending_orders = filter_orders(
+            Order.objects.filter(status='processing'),
+            parse_order_filters(request.query_params)
+        ).select_related('user', 'shipping_address', 'payment').prefetch_related('items')
+
+        if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return self.stream(pending_orders)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(pending_orders, request, view=self)
+        return paginator.get_paginated_response([serialize_pending_order(order) for order in page])
+
+    def stream(self, pending_orders):
+        # iterator() fetches and prefetches items chunk by chunk, so memory stays flat
+        orders = pending_orders.order_by(*self.pagination_class.ordering).iterator(chunk_size=self.stream_chunk_size)
+        lines = (
+            json.dumps(serialize_pending_order(order), cls=DjangoJSONEncoder) + '\n'
+            for order in orders
         )
-        
-        # Custom serializer or build response manually
-        orders_data = []
-        for order in pending_orders:
-            orders_data.append({
-                'order_number': order.order_number,
-                'user': {
-                    'email': order.user.email,
-                    # 'phone': order.user.phone_number,  # Add phone field to your User model
-                    'name': order.user.username
-                },
-                'shipping_address': {
-                    'street': order.shipping_address.street,
-                    'city': order.shipping_address.city,
-                    'state': order.shipping_address.state,
-                    'zip_code': order.shipping_address.zip_code,
-                    # 'country': order.shipping_address.country,
-                    'phone' : order.shipping_address.phone
-                } if order.shipping_address else None,
-                'payment': {
-                    'method': order.payment.get_payment_method_display(),
-                    'amount': float(order.payment.amount),
-                    'utr_number': order.payment.utr_number,
-                    'payment_date': order.payment.payment_date,
-                    'transaction_ss': order.payment.transaction_ss.url if order.payment.transaction_ss else None
-                },
-                'items': [{
-                    'product_name': item.product_name,
-                    'quantity': item.quantity,
-                    'price': float(item.product_price),
-                    'total': float(item.total_price)
-                } for item in order.items.all()],
-                'total_amount': float(order.total_amount),
-                'created_at': order.created_at
-            })
-        
-        return Response(orders_data)
+        return BatchedStreamingHttpResponse(lines, content_type='application/x-ndjson', batch_size=self.stream_chunk_size)
 
 class AdminOrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
@@ -173,6 +194,7 @@ class AdminUpdateOrderStatusView(APIView):
         # Update order status
         order.status = new_status
         order.save()
+        publish_order_status(order)
         
         # Update payment status
         payment = order.payment
@@ -190,26 +212,81 @@ class AdminUpdateOrderStatusView(APIView):
         })
     
     def send_status_email(self, order, new_status, admin_notes):
-        subject = f'Order {order.order_number} {new_status}'
+        enqueue_email(**build_status_email(order, new_status, admin_notes))
+
+class AdminBulkUpdateOrderStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+    serialiser_class = None
+    max_orders = 1000
+    
+    def post(self, request):
+        """
+        Approve or reject many orders at once (admin only).
+        Body: {"orders": [{"order_number": ..., "status": "confirmed"|"cancelled", "admin_notes": ...}]}
+        Responds with one outcome per requested order, in request order.
+        """
+        if not request.user.is_admin:
+            return Response(
+                {'error': 'Admin access required'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
         
-        context = {
-            'order': order,
-            'status': new_status,
-            'admin_notes': admin_notes,
-            'order_url': f'{settings.FRONTEND_URL}/orders/{order.order_number}'
-        }
+        entries = request.data.get('orders') if isinstance(request.data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            return Response(
+                {'error': '"orders" must be a non-empty list'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(entries) > self.max_orders:
+            return Response(
+                {'error': f'At most {self.max_orders} orders per request'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        html_message = render_to_string('emails/order_status_update.html', context)
-        plain_message = strip_tags(html_message)
+        decisions = {}
+        errors = {}
+        for entry in entries:
+            order_number = entry.get('order_number') if isinstance(entry, dict) else None
+            if not isinstance(order_number, str) or not order_number:
+                continue
+            if order_number in decisions or order_number in errors:
+                errors[order_number] = 'Order appears more than once in the request'
+                decisions.pop(order_number, None)
+            elif not isinstance(entry.get('status'), str) or entry['status'] not in PAYMENT_STATUS_FOR:
+                errors[order_number] = 'Status must be "confirmed" or "cancelled"'
+            elif not isinstance(entry.get('admin_notes', ''), str):
+                errors[order_number] = 'admin_notes must be a string'
+            else:
+                decisions[order_number] = (entry['status'], entry.get('admin_notes', ''))
         
-        send_mail(
-            subject,
-            plain_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [order.user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        updated, skipped = bulk_update_order_status(decisions) if decisions else ([], {})
+        updated = {order.order_number: order.status for order in updated}
+        
+        results = []
+        for entry in entries:
+            order_number = entry.get('order_number') if isinstance(entry, dict) else None
+            # Type first: anything else (e.g. a list) can't be looked up below
+            if not isinstance(order_number, str) or not order_number:
+                results.append({'order_number': order_number, 'updated': False, 'error': 'order_number must be a non-empty string'})
+            elif order_number in updated:
+                results.append({'order_number': order_number, 'updated': True, 'new_status': updated[order_number]})
+            elif order_number in errors:
+                results.append({'order_number': order_number, 'updated': False, 'error': errors[order_number]})
+            elif order_number in skipped:
+                results.append({
+                    'order_number': order_number,
+                    'updated': False,
+                    'error': 'Order is not in pending verification status',
+                    'current_status': skipped[order_number],
+                })
+            else:
+                results.append({'order_number': order_number, 'updated': False, 'error': 'Order not found'})
+        
+        return Response({
+            'updated': len(updated),
+            'failed': len(results) - len(updated),
+            'results': results
+        })
 
 class AdminOrdersByStatusView(APIView):
     permission_classes = [IsAuthenticated]
@@ -250,4 +327,118 @@ class AdminOrdersByStatusView(APIView):
             'updated_at': order.updated_at
         } for order in orders]
         
-        return Response(orders_data)
\ No newline at end of file
+        return Response(orders_data)
+
+class AdminOrderSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+    serialiser_class = None
+    pagination_class = OrderSearchPagination
+    
+    def get(self, request):
+        """
+        Search orders by customer email fragment, UTR number, order number
+        prefix, status, payment method, date and amount range (admin only).
+        """
+        if not request.user.is_admin:
+            return Response(
+                {'error': 'Admin access required'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        filters = parse_search_filters(request.query_params)
+        if not filters:
+            return Response(
+                {'error': 'At least one search parameter is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        orders = search_orders(Order.objects.all(), filters).select_related('user', 'payment')
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        
+        return paginator.get_paginated_response([{
+            'order_number': order.order_number,
+            'user_email': order.user.email,
+            'total_amount': float(order.total_amount),
+            'status': order.status,
+            'payment_method': order.payment.payment_method if hasattr(order, 'payment') else None,
+            'utr_number': order.payment.utr_number if hasattr(order, 'payment') else None,
+            'created_at': order.created_at,
+            'updated_at': order.updated_at
+        } for order in page])
+
+class Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+class AdminOrderExportView(APIView):
+    permission_classes = [IsAuthenticated]
+    serialiser_class = None
+    chunk_size = 2000
+    
+    # (column name, OrderItem lookup); one exported row per order item
+    columns = [
+        ('order_number', 'order__order_number'),
+        ('order_status', 'order__status'),
+        ('order_created_at', 'order__created_at'),
+        ('order_total', 'order__total_amount'),
+        ('customer_email', 'order__user__email'),
+        ('customer_name', 'order__user__username'),
+        ('payment_method', 'order__payment__payment_method'),
+        ('payment_status', 'order__payment__status'),
+        ('payment_amount', 'order__payment__amount'),
+        ('utr_number', 'order__payment__utr_number'),
+        ('payment_date', 'order__payment__payment_date'),
+        ('address_street', 'order__shipping_address__street'),
+        ('address_city', 'order__shipping_address__city'),
+        ('address_state', 'order__shipping_address__state'),
+        ('address_zip_code', 'order__shipping_address__zip_code'),
+        ('address_phone', 'order__shipping_address__phone'),
+        ('product_name', 'product_name'),
+        ('product_price', 'product_price'),
+        ('quantity', 'quantity'),
+        ('item_total', 'total_price'),
+    ]
+    
+    def get(self, request):
+        """
+        Stream orders joined with items, payment and address (admin only).
+        ?type=csv (default) or ndjson; accepts the order search filters
+        (status, created_from/created_to, payment_method, amounts, ...).
+        """
+        if not request.user.is_admin:
+            return Response(
+                {'error': 'Admin access required'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        export_type = request.query_params.get('type', 'csv')
+        if export_type not in ('csv', 'ndjson'):
+            return Response(
+                {'error': 'type must be "csv" or "ndjson"'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        orders = search_orders(Order.objects.all(), parse_search_filters(request.query_params))
+        # Flat tuples straight from a server-side cursor: no model instances, constant memory
+        rows = (
+            OrderItem.objects.filter(order__in=orders)
+            .order_by('order__created_at', 'order_id', 'id')
+            .values_list(*[lookup for _, lookup in self.columns])
+            .iterator(chunk_size=self.chunk_size)
+        )
+        
+        if export_type == 'ndjson':
+            names = [name for name, _ in self.columns]
+            lines = (json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+            response = BatchedStreamingHttpResponse(lines, content_type='application/x-ndjson', batch_size=self.chunk_size)
+        else:
+            writer = csv.writer(Echo())
+            header = [writer.writerow([name for name, _ in self.columns])]
+            lines = itertools.chain(header, (writer.writerow(row) for row in rows))
+            response = BatchedStreamingHttpResponse(lines, content_type='text/csv', batch_size=self.chunk_size)
+        
+        filename = f'orders-{timezone.localdate():%Y%m%d}.{export_type}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
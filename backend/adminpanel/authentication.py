@@ -0,0 +1,41 @@
+from django.core.exceptions import ValidationError
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+from .revocation import TOKEN_VERSION_CLAIM, get_token_version
+
+# User fields carried in tokens by MyTokenObtainPairSerializer.get_token
+CLAIM_FIELDS = ('username', 'email', 'is_admin', TOKEN_VERSION_CLAIM)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that builds request.user from the token's claims
+    instead of loading the row, so authenticating costs no query once the
+    user's token version is cached. id, username, email and is_admin come
+    from the token; touching any other field loads the whole row once.
+
+    Revocation is by token version: a token whose version claim no longer
+    matches the user's (see revoke_user_tokens) or whose user is inactive is
+    rejected. Tokens issued without the claims fall back to the row lookup.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+        try:
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if validated_token[TOKEN_VERSION_CLAIM] != get_token_version(user_id):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+        values = {'id': user_id, **{name: validated_token[name] for name in CLAIM_FIELDS}}
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+        user = User.from_db(router.db_for_read(User), field_names, [values[name] for name in field_names])
+        user._from_claims = True
+        return user
@@ -0,0 +1,32 @@
+from core.utils.params import parse_bool_param, parse_datetime_param
+
+
+def parse_user_filters(params):
+    """Validate ?is_active=&is_admin=&created_from=&created_to=&email= into a dict."""
+    filters = {}
+    for name in ('is_active', 'is_admin'):
+        value = parse_bool_param(name, params.get(name))
+        if value is not None:
+            filters[name] = value
+    if params.get('created_from'):
+        filters['created_from'] = parse_datetime_param('created_from', params['created_from'])
+    if params.get('created_to'):
+        filters['created_to'] = parse_datetime_param('created_to', params['created_to'], end_of_day=True)
+    email = params.get('email', '').strip()
+    if email:
+        filters['email'] = email
+    return filters
+
+
+def filter_users(queryset, filters):
+    for name in ('is_active', 'is_admin'):
+        if name in filters:
+            queryset = queryset.filter(**{name: filters[name]})
+    if 'created_from' in filters:
+        queryset = queryset.filter(created_at__gte=filters['created_from'])
+    if 'created_to' in filters:
+        queryset = queryset.filter(created_at__lte=filters['created_to'])
+    if 'email' in filters:
+        # Case-sensitive prefix, so Postgres can use the pattern-ops index on the unique email
+        queryset = queryset.filter(email__startswith=filters['email'])
+    return queryset
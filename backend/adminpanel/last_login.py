@@ -0,0 +1,79 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    Write-behind buffer for User.last_login.
+
+    Logins only record a timestamp in memory; the latest one per user is
+    written by a batched UPDATE at most every LAST_LOGIN_WRITE_WINDOW
+    seconds, so each process writes a user's row at most once per window
+    however often that account logs in. A daemon timer runs the flush, and
+    anything still pending is written at exit. A crash loses at most one
+    window of timestamps.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def record(self, user_id, when):
+        with self._lock:
+            self._pending[user_id] = when
+            if self._timer is None:
+                self._timer = threading.Timer(settings.LAST_LOGIN_WRITE_WINDOW, self._flush_in_thread)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write all pending timestamps. Returns the number of users written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        items = list(pending.items())
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            User.objects.filter(id__in=[user_id for user_id, _ in batch]).update(
+                last_login=Case(
+                    *[When(id=user_id, then=Value(when)) for user_id, when in batch],
+                    output_field=DateTimeField(),
+                )
+            )
+        return len(items)
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not write last_login timestamps")
+        finally:
+            connection.close()
+
+
+last_logins = LastLoginBuffer()
+atexit.register(last_logins.flush)
+
+
+def record_login(user):
+    """Replacement for update_last_login: sets user.last_login now, persists it later."""
+    user.last_login = timezone.now()
+    last_logins.record(user.pk, user.last_login)
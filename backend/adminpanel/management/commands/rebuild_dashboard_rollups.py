@@ -0,0 +1,19 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from adminpanel.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard daily rollups from orders and users (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day (YYYY-MM-DD), default: all')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day (YYYY-MM-DD), default: all')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rebuild_rollups(options['start'], options['end'])
+        self.stdout.write(f'Rebuilt dashboard rollups in {time.monotonic() - started:.2f}s')
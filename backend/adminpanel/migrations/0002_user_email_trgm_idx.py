@@ -0,0 +1,32 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Serves user__email__icontains (UPPER(email::text) LIKE UPPER('%...%')) in the
+# admin order search. Postgres-only, so created here instead of Meta.indexes.
+CREATE_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS user_email_upper_trgm_gin '
+    'ON adminpanel_user USING gin ((UPPER(email::text)) gin_trgm_ops)'
+)
+DROP_INDEX_SQL = 'DROP INDEX IF EXISTS user_email_upper_trgm_gin'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminpanel', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -46,15 +46,32 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Copied into issued tokens; bumping it revokes every token issued so far
+    token_version = models.PositiveIntegerField(default=0)
     
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    class Meta:
+        indexes = [
+            # Admin user listing: ORDER BY created_at DESC, id DESC, optionally by is_active
+            models.Index(fields=['created_at', 'id'], name='user_created_idx'),
+            models.Index(fields=['is_active', 'created_at', 'id'], name='user_active_created_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if getattr(self, '_from_claims', False):
+            # Built from token claims (ClaimsJWTAuthentication): the first
+            # touch of any other field loads the whole row, claims included
+            self._from_claims = False
+            fields = [field.attname for field in self._meta.concrete_fields]
+        super().refresh_from_db(using, fields, from_queryset)
+
 class OTP(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     otp_secret = models.CharField(max_length=32)
@@ -76,4 +93,45 @@ class OTP(models.Model):
 
     def verify_otp(self, otp):
         totp = pyotp.TOTP(self.otp_secret, interval=300)
-        return totp.verify(otp)
\ No newline at end of file
+        return totp.verify(otp)
+
+# ==================== DASHBOARD ROLLUPS ====================
+# Per-day counters maintained incrementally by adminpanel.rollups, so dashboard
+# reads scan one row per day (and status/product) instead of every order.
+
+class DailyOrderRollup(models.Model):
+    """Orders created on `day` that are currently in `status`, and their total amount."""
+    day = models.DateField()
+    status = models.CharField(max_length=25)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_order_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.order_count}"
+
+class DailyProductRollup(models.Model):
+    """Units and revenue per product for paid orders created on `day`."""
+    day = models.DateField()
+    product_name = models.CharField(max_length=255)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product_name'], name='unique_daily_product_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_name}: {self.quantity}"
+
+class DailySignupRollup(models.Model):
+    day = models.DateField(unique=True)
+    user_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.user_count}"
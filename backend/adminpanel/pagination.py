@@ -0,0 +1,8 @@
+from core.utils.pagination import KeysetPagination
+
+
+class UserListPagination(KeysetPagination):
+    """Newest users first."""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,153 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenBlacklistSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+class RevocationSet:
+    """
+    Per-process set of blacklisted refresh-token JTIs.
+
+    Loaded on first use and kept current by polling BlacklistedToken for ids
+    above the last one seen (at most every TOKEN_REVOCATION_SYNC_INTERVAL
+    seconds), so a refresh with a token that was never revoked costs no query.
+    A JTI in the set is still confirmed against the database. Tokens revoked
+    by another process are picked up within one sync interval. Each sync also
+    re-reads the last TOKEN_REVOCATION_SYNC_OVERLAP ids, so a row that
+    commits after a higher id was already seen isn't missed. The set is
+    rebuilt from unexpired tokens every TOKEN_REVOCATION_RELOAD_INTERVAL
+    seconds so it doesn't grow forever.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = set()
+        self._last_id = None
+        self._synced_at = 0
+        self._loaded_at = 0
+
+    def _load(self, now):
+        # Read the high-water mark first; rows added meanwhile are caught by the next sync
+        last_id = BlacklistedToken.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        jtis = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).values_list('token__jti', flat=True)
+        self._jtis = set(jtis.iterator(chunk_size=5000))
+        self._last_id = last_id
+        self._loaded_at = now
+
+    def _sync(self):
+        rows = (
+            BlacklistedToken.objects.filter(id__gt=self._last_id - settings.TOKEN_REVOCATION_SYNC_OVERLAP)
+            .order_by('id')
+            .values_list('id', 'token__jti')
+        )
+        for row_id, jti in rows:
+            self._jtis.add(jti)
+            self._last_id = max(self._last_id, row_id)
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._synced_at < settings.TOKEN_REVOCATION_SYNC_INTERVAL:
+            return
+        with self._lock:
+            if not force and now - self._synced_at < settings.TOKEN_REVOCATION_SYNC_INTERVAL:
+                return
+            if self._last_id is None or now - self._loaded_at >= settings.TOKEN_REVOCATION_RELOAD_INTERVAL:
+                self._load(now)
+            else:
+                self._sync()
+            self._synced_at = now
+
+    def might_be_revoked(self, jti):
+        self.refresh()
+        return jti in self._jtis
+
+    def add(self, jti):
+        """Record a revocation made by this process without waiting for the next sync."""
+        self._jtis.add(jti)
+
+    def clear(self):
+        with self._lock:
+            self._jtis = set()
+            self._last_id = None
+            self._synced_at = 0
+
+
+revocations = RevocationSet()
+
+
+def token_version_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """
+    The token version of an active user, None if the user is inactive or
+    gone. Cached for TOKEN_VERSION_CACHE_TIMEOUT seconds, which bounds how
+    long a revocation takes to reach processes that don't share the cache.
+    """
+    key = token_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = User.objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+        version = row[0] if row and row[1] else -1
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return None if version < 0 else version
+
+
+def revoke_user_tokens(user):
+    """Invalidate every access and refresh token issued to user so far."""
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    key = token_version_key(user.pk)
+    cache.delete(key)
+    # Again after commit, in case a concurrent request re-cached the old version
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def is_token_current(payload):
+    """False if the token's version claim is stale. Tokens issued without the claim are not checked."""
+    if TOKEN_VERSION_CLAIM not in payload:
+        return True
+    return payload[TOKEN_VERSION_CLAIM] == get_token_version(payload[api_settings.USER_ID_CLAIM])
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check only queries the database for JTIs in
+    the revocation set, and which is rejected once its token version is stale.
+    """
+
+    def verify(self):
+        super().verify()
+        if not is_token_current(self.payload):
+            raise TokenError('Token has been revoked')
+
+    def check_blacklist(self):
+        if revocations.might_be_revoked(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        revocations.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedRefreshToken
+
+
+class CachedTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = CachedRefreshToken
@@ -0,0 +1,191 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import DailyOrderRollup, DailyProductRollup, DailySignupRollup, User
+
+# Orders in these statuses have a verified payment: they count as revenue and
+# towards top products
+PAID_STATUSES = ('confirmed', 'shipped', 'delivered')
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def increment(model, keys, **deltas):
+    """Add deltas to the rollup row identified by keys, creating it if needed."""
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    if model.objects.filter(**keys).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**keys).update(**updates)
+
+
+def apply_order_changes(changes):
+    """changes: [(order_id, day, total_amount, old_status or None, new_status)]"""
+    order_deltas = defaultdict(lambda: [0, Decimal('0')])
+    paid_sign = {}
+    for order_id, day, total_amount, old_status, new_status in changes:
+        if old_status is not None:
+            order_deltas[day, old_status][0] -= 1
+            order_deltas[day, old_status][1] -= total_amount
+        order_deltas[day, new_status][0] += 1
+        order_deltas[day, new_status][1] += total_amount
+        sign = (new_status in PAID_STATUSES) - (old_status in PAID_STATUSES)
+        if sign:
+            paid_sign[order_id] = (day, sign)
+
+    product_deltas = defaultdict(lambda: [0, Decimal('0')])
+    if paid_sign:
+        items = OrderItem.objects.filter(order_id__in=paid_sign).values_list(
+            'order_id', 'product_name', 'quantity', 'total_price'
+        )
+        for order_id, product_name, quantity, total_price in items:
+            day, sign = paid_sign[order_id]
+            product_deltas[day, product_name][0] += sign * quantity
+            product_deltas[day, product_name][1] += sign * total_price
+
+    for (day, status), (count, revenue) in order_deltas.items():
+        if count or revenue:
+            increment(DailyOrderRollup, {'day': day, 'status': status}, order_count=count, revenue=revenue)
+    for (day, product_name), (quantity, revenue) in product_deltas.items():
+        if quantity or revenue:
+            increment(DailyProductRollup, {'day': day, 'product_name': product_name}, quantity=quantity, revenue=revenue)
+
+
+def record_status_changes(orders, old_status):
+    """
+    Count orders (Order instances already carrying their new status) as moved
+    out of old_status (None for new orders). Applied after commit in short
+    autocommit statements, so busy checkouts don't queue on the same rollup
+    row. A failure there is logged, not raised into the already committed
+    request; any drift it leaves is fixed by rebuild_rollups.
+    """
+    changes = [
+        (order.id, timezone.localdate(order.created_at), order.total_amount, old_status, order.status)
+        for order in orders
+        if order.status != old_status
+    ]
+    if changes:
+        transaction.on_commit(lambda: apply_order_changes(changes), robust=True)
+
+
+def record_signup(user):
+    day = timezone.localdate(user.created_at)
+    transaction.on_commit(lambda: increment(DailySignupRollup, {'day': day}, user_count=1), robust=True)
+
+
+@transaction.atomic
+def rebuild_rollups(start=None, end=None):
+    """Recompute the rollups for days in [start, end] (all days if omitted) from the source tables."""
+    def day_range(queryset, field):
+        if start:
+            queryset = queryset.filter(**{f'{field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{field}__lte': end})
+        return queryset
+
+    for model in (DailyOrderRollup, DailyProductRollup, DailySignupRollup):
+        day_range(model.objects.all(), 'day').delete()
+
+    orders = day_range(Order.objects.annotate(day=TruncDate('created_at')), 'day')
+    DailyOrderRollup.objects.bulk_create([
+        DailyOrderRollup(day=row['day'], status=row['status'], order_count=row['count'], revenue=row['revenue'])
+        for row in orders.values('day', 'status').annotate(count=Count('id'), revenue=Sum('total_amount')).order_by()
+    ], batch_size=1000)
+
+    items = day_range(OrderItem.objects.annotate(day=TruncDate('order__created_at')), 'day')
+    DailyProductRollup.objects.bulk_create([
+        DailyProductRollup(day=row['day'], product_name=row['product_name'], quantity=row['quantity'], revenue=row['revenue'])
+        for row in items.filter(order__status__in=PAID_STATUSES)
+        .values('day', 'product_name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('total_price'))
+        .order_by()
+    ], batch_size=1000)
+
+    users = day_range(User.objects.annotate(day=TruncDate('created_at')), 'day')
+    DailySignupRollup.objects.bulk_create([
+        DailySignupRollup(day=row['day'], user_count=row['count'])
+        for row in users.values('day').annotate(count=Count('id')).order_by()
+    ], batch_size=1000)
+
+
+def get_order_stats(user_ids):
+    """{user_id: {order_count, lifetime_spend}} for the given users in one grouped query."""
+    rows = (
+        Order.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(
+            order_count=Count('id'),
+            lifetime_spend=Sum('total_amount', filter=Q(status__in=PAID_STATUSES), default=Decimal('0')),
+        )
+        .order_by()
+    )
+    return {
+        row['user_id']: {'order_count': row['order_count'], 'lifetime_spend': row['lifetime_spend']}
+        for row in rows
+    }
+
+
+def get_dashboard_stats(start, end, period='day', top_products=10):
+    """Revenue, orders by status, new users per period and top products, read from the rollups only."""
+    bucket = PERIODS[period]('day')
+    series = defaultdict(lambda: {'orders': {}, 'order_count': 0, 'revenue': Decimal('0'), 'new_users': 0})
+
+    order_rows = (
+        DailyOrderRollup.objects.filter(day__range=(start, end))
+        .annotate(period=bucket)
+        .values('period', 'status')
+        .annotate(count=Sum('order_count'), revenue=Sum('revenue'))
+        .order_by()
+    )
+    for row in order_rows:
+        entry = series[row['period']]
+        entry['orders'][row['status']] = row['count']
+        entry['order_count'] += row['count']
+        if row['status'] in PAID_STATUSES:
+            entry['revenue'] += row['revenue']
+
+    signup_rows = (
+        DailySignupRollup.objects.filter(day__range=(start, end))
+        .annotate(period=bucket)
+        .values('period')
+        .annotate(count=Sum('user_count'))
+        .order_by()
+    )
+    for row in signup_rows:
+        series[row['period']]['new_users'] = row['count']
+
+    products = (
+        DailyProductRollup.objects.filter(day__range=(start, end))
+        .values('product_name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .filter(quantity__gt=0)
+        .order_by('-revenue', 'product_name')[:top_products]
+    )
+
+    periods = [{'period': key, **series[key]} for key in sorted(series)]
+    return {
+        'period': period,
+        'start': start,
+        'end': end,
+        'totals': {
+            'revenue': sum((entry['revenue'] for entry in periods), Decimal('0')),
+            'order_count': sum(entry['order_count'] for entry in periods),
+            'new_users': sum(entry['new_users'] for entry in periods),
+        },
+        'series': periods,
+        'top_products': list(products),
+    }
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import User, OTP
+from .last_login import record_login
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
@@ -9,6 +10,11 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'is_admin', 'created_at']
         read_only_fields = ['created_at']
 
+class AdminUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'is_admin', 'is_active', 'created_at', 'last_login']
+
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -43,9 +49,15 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['username'] = user.username
         token['email'] = user.email
         token['is_admin'] = user.is_admin
+        token['token_version'] = user.token_version
         
         return token
 
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        record_login(self.user)
+        return data
+
 
 class OTPSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,49 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .revocation import revoke_user_tokens
+from .rollups import record_signup, record_status_changes
+
+
+@receiver(post_init, sender='orders.Order')
+def remember_original_status(sender, instance, **kwargs):
+    # Raw value, so a deferred status isn't loaded just for this
+    instance._rollup_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender='orders.Order')
+def update_order_rollups(sender, instance, created, **kwargs):
+    """Keep the dashboard rollups in step with orders saved through the ORM (set-based updates call record_status_changes themselves)."""
+    status = instance.__dict__.get('status')
+    if status is None:
+        return
+    if created:
+        record_status_changes([instance], None)
+    elif status != instance._rollup_status:
+        record_status_changes([instance], instance._rollup_status)
+    instance._rollup_status = status
+
+
+@receiver(post_save, sender=User)
+def update_signup_rollups(sender, instance, created, **kwargs):
+    if created:
+        record_signup(instance)
+
+
+@receiver(post_init, sender=User)
+def remember_token_claims(sender, instance, **kwargs):
+    instance._claimed_access = (instance.__dict__.get('is_admin'), instance.__dict__.get('is_active'))
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_access_change(sender, instance, created, **kwargs):
+    """Tokens carry is_admin, so demoting, promoting or deactivating a user revokes them."""
+    was_admin, was_active = instance._claimed_access
+    is_admin, is_active = instance.__dict__.get('is_admin'), instance.__dict__.get('is_active')
+    if not created and (
+        None not in (was_admin, is_admin) and was_admin != is_admin
+        or was_active and is_active is False
+    ):
+        revoke_user_tokens(instance)
+    instance._claimed_access = (is_admin, is_active)
@@ -1,3 +1,304 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem, Payment
+from orders.tests import create_customer
+from .models import DailyOrderRollup, DailyProductRollup, DailySignupRollup, User
+from .last_login import LastLoginBuffer, last_logins
+from .revocation import CachedRefreshToken, revocations, revoke_user_tokens
+from .serializers import MyTokenObtainPairSerializer
+from .rollups import rebuild_rollups
+
+
+class DashboardRollupTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin = User.objects.create_user('admin', 'admin@example.com', 'password', is_active=True, is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def place_order(self, user, address, amount, product_name='Mug'):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(user=user, total_amount=amount, shipping_address=address)
+            Payment.objects.create(order=order, payment_method='upi', amount=amount)
+            OrderItem.objects.create(order=order, product_name=product_name, product_price=amount, quantity=1)
+        return order
+
+    def set_status(self, order, new_status):
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = new_status
+            order.save()
+
+    def snapshot(self):
+        return (
+            sorted(DailyOrderRollup.objects.exclude(order_count=0).values_list('day', 'status', 'order_count', 'revenue')),
+            sorted(DailyProductRollup.objects.exclude(quantity=0).values_list('day', 'product_name', 'quantity', 'revenue')),
+            sorted(DailySignupRollup.objects.values_list('day', 'user_count')),
+        )
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            customers = [create_customer(i) for i in range(3)]
+        first = self.place_order(*customers[0], 100)
+        second = self.place_order(*customers[1], 250, product_name='Plate')
+        third = self.place_order(*customers[2], 40)
+        for order in (first, second, third):
+            self.set_status(order, 'processing')
+        self.set_status(first, 'confirmed')
+        self.set_status(second, 'confirmed')
+        self.set_status(second, 'refunded')
+        self.set_status(third, 'cancelled')
+
+        incremental = self.snapshot()
+        rebuild_rollups()
+        self.assertEqual(self.snapshot(), incremental)
+
+        today = timezone.localdate()
+        self.assertEqual(
+            list(DailyProductRollup.objects.filter(quantity__gt=0).values_list('product_name', 'revenue')),
+            [('Mug', Decimal('100.00'))]
+        )
+        self.assertEqual(DailySignupRollup.objects.get(day=today).user_count, 4)
+
+    def test_stats_endpoint_reads_rollups_only(self):
+        user, address = create_customer(0)
+        self.set_status(self.place_order(user, address, 100), 'confirmed')
+        self.place_order(user, address, 30)
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/auth/admin-dashboard/stats/', {'period': 'month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals']['order_count'], 2)
+        self.assertEqual(response.data['totals']['revenue'], Decimal('100.00'))
+        self.assertEqual(response.data['series'][0]['orders'], {'confirmed': 1, 'pending_verification': 1})
+        self.assertEqual(response.data['top_products'][0]['product_name'], 'Mug')
+
+        self.assertEqual(self.client.get('/api/auth/admin-dashboard/stats/', {'period': 'year'}).status_code, 400)
+
+
+    def test_rollup_failure_does_not_fail_the_committed_request(self):
+        user, address = create_customer(0)
+        with mock.patch('adminpanel.rollups.increment', side_effect=DatabaseError('rollup row locked')), \
+                self.assertLogs(level='ERROR'):
+            order = self.place_order(user, address, 100)
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+        rebuild_rollups()
+        self.assertEqual(DailyOrderRollup.objects.get(status='pending_verification').order_count, 1)
+
+
+class AdminUserListTests(TestCase):
+    url = '/api/auth/admin-dashboard/'
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password', is_active=True, is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.customers = [create_customer(i) for i in range(5)]
+        User.objects.create_user('pending', 'pending@example.com', 'password')
+
+    def list_users(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_filters(self):
+        self.assertEqual([u['email'] for u in self.list_users(is_active='false')['results']], ['pending@example.com'])
+        self.assertEqual([u['email'] for u in self.list_users(is_admin='true')['results']], ['admin@example.com'])
+        self.assertEqual(len(self.list_users(email='customer')['results']), 5)
+        self.assertEqual(len(self.list_users(created_to='2000-01-01')['results']), 0)
+        self.assertEqual(self.client.get(self.url, {'is_active': 'maybe'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'created_to': '2024-02-30'}).status_code, 400)
+
+    def test_keyset_pages(self):
+        data = self.list_users(page_size=4)
+        self.assertEqual(len(data['results']), 4)
+        rest = self.list_users(page_size=4, cursor=data['next_cursor'])
+        self.assertEqual(len(rest['results']), 3)
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_order_stats_in_one_grouped_query(self):
+        user, address = self.customers[0]
+        for amount, order_status in ((100, 'confirmed'), (50, 'delivered'), (20, 'cancelled')):
+            Order.objects.create(user=user, total_amount=amount, shipping_address=address, status=order_status)
+
+        with self.assertNumQueries(2):
+            data = self.list_users(with_orders='true', email='customer')
+        stats = {u['email']: (u['order_count'], u['lifetime_spend']) for u in data['results']}
+        self.assertEqual(stats['customer0@example.com'], (3, Decimal('150.00')))
+        self.assertEqual(stats['customer1@example.com'], (0, Decimal('0')))
+
+
+class RevocationSetTests(TestCase):
+    def setUp(self):
+        revocations.clear()
+        self.user, _ = create_customer(0)
+        self.client = APIClient()
+
+    def refresh(self, token):
+        self.client.cookies['refresh'] = str(token)
+        return self.client.post('/api/auth/token/refresh/')
+
+    def test_unrevoked_token_is_checked_without_queries(self):
+        token = RefreshToken.for_user(self.user)
+        revocations.refresh(force=True)
+        with self.assertNumQueries(0):
+            CachedRefreshToken(str(token))
+
+    def test_rotated_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    @override_settings(TOKEN_REVOCATION_SYNC_INTERVAL=0)
+    def test_revocation_by_another_process_is_synced(self):
+        token = RefreshToken.for_user(self.user)
+        revocations.refresh(force=True)
+        # Blacklisted outside this process's revocation set
+        RefreshToken(str(token)).blacklist()
+        with self.assertRaises(TokenError):
+            CachedRefreshToken(str(token))
+
+    @override_settings(TOKEN_REVOCATION_SYNC_INTERVAL=0)
+    def test_rows_committed_out_of_id_order_are_synced(self):
+        early, late = RefreshToken.for_user(self.user), RefreshToken.for_user(self.user)
+        revocations.refresh(force=True)
+        outstanding = dict(OutstandingToken.objects.values_list('jti', 'pk'))
+        BlacklistedToken.objects.create(id=10, token_id=outstanding[late['jti']])
+        self.assertTrue(revocations.might_be_revoked(late['jti']))
+        # A lower id that only becomes visible after id 10 was seen
+        BlacklistedToken.objects.create(id=5, token_id=outstanding[early['jti']])
+        self.assertTrue(revocations.might_be_revoked(early['jti']))
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.address = create_customer(0)
+        Order.objects.create(user=self.user, total_amount=10, shipping_address=self.address)
+        self.client = APIClient()
+        self.login()
+
+    def login(self):
+        refresh = MyTokenObtainPairSerializer.get_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        return refresh
+
+    def test_order_reads_make_no_auth_queries(self):
+        # First request caches the token version
+        with self.assertNumQueries(2):
+            self.client.get('/api/orders/order/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/order/')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_other_fields_load_the_row_once(self):
+        self.client.get('/api/auth/profile/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.data['email'], self.user.email)
+        self.assertIsNotNone(response.data['created_at'])
+
+    def test_revoked_tokens_are_rejected(self):
+        refresh = CachedRefreshToken(str(self.login()))
+        revoke_user_tokens(self.user)
+        self.assertEqual(self.client.get('/api/orders/order/').status_code, 401)
+        with self.assertRaises(TokenError):
+            CachedRefreshToken(str(refresh))
+
+        self.login()
+        self.assertEqual(self.client.get('/api/orders/order/').status_code, 200)
+
+    def test_password_change_revokes_other_tokens_and_reissues(self):
+        self.user.set_password('password')
+        self.user.save()
+        old_refresh = self.login()
+        response = self.client.post('/api/profile/change-password/', {
+            'current_password': 'password',
+            'new_password': 'N3w-passphrase',
+            'confirm_password': 'N3w-passphrase',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaises(TokenError):
+            CachedRefreshToken(str(old_refresh))
+        self.assertEqual(self.client.get('/api/orders/order/').status_code, 401)
+
+        CachedRefreshToken(response.cookies['refresh'].value)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/orders/order/').status_code, 200)
+
+    def test_demotion_and_deactivation_revoke_tokens(self):
+        self.user.is_admin = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/orders/order/').status_code, 401)
+
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/orders/order/').status_code, 401)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(last_logins.flush)
+        self.user = User.objects.create_user('customer', 'customer@example.com', 'password', is_active=True)
+
+    def login(self, password):
+        return APIClient().post('/api/auth/login/', {'email': self.user.email, 'password': password}, format='json')
+
+    def test_password_is_hashed_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, side_effect=User.check_password) as check:
+            response = self.login('password')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(check.call_count, 1)
+        self.assertIn('refresh', response.cookies)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(client.get('/api/auth/profile/').data['email'], self.user.email)
+
+    def test_wrong_password_is_rejected(self):
+        self.assertEqual(self.login('wrong').status_code, 401)
+
+    def test_last_login_is_written_behind(self):
+        for _ in range(3):
+            # User lookup and OutstandingToken insert, no UPDATE
+            with self.assertNumQueries(2):
+                self.assertEqual(self.login('password').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(last_logins.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+
+class LastLoginBufferTests(TestCase):
+    def test_flush_writes_latest_timestamp_per_user_in_batches(self):
+        users = [create_customer(index)[0] for index in range(5)]
+        buffer = LastLoginBuffer(batch_size=2)
+        now = timezone.now()
+        for offset in range(3):
+            for user in users:
+                buffer.record(user.pk, now + timedelta(minutes=offset))
+        self.assertEqual(buffer.pending_count(), 5)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(buffer.pending_count(), 0)
+        self.assertEqual(
+            set(User.objects.filter(id__in=[user.pk for user in users]).values_list('last_login', flat=True)),
+            {now + timedelta(minutes=2)},
+        )
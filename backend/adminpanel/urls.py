@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import (RegisterView, VerifyOTPView, LoginView, RefreshTokenView, UserProfileView, AdminDashboardView, LogoutView, )
+from .views import (RegisterView, VerifyOTPView, LoginView, RefreshTokenView, UserProfileView, AdminDashboardView, AdminDashboardStatsView, LogoutView, )
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
@@ -9,4 +9,5 @@ urlpatterns = [
     path('token/refresh/', RefreshTokenView.as_view(), name='token-refresh'),
     path('profile/', UserProfileView.as_view(), name='profile'),
     path('admin-dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
+    path('admin-dashboard/stats/', AdminDashboardStatsView.as_view(), name='admin-dashboard-stats'),
 ]
\ No newline at end of file
@@ -2,21 +2,29 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth import authenticate
-from django.core.mail import send_mail
 from django.conf import settings
 from .models import User, OTP
-from .serializers import (UserSerializer, RegisterSerializer, MyTokenObtainPairSerializer, OTPSerializer, EmptySerializer)
+from .serializers import (UserSerializer, AdminUserSerializer, RegisterSerializer, MyTokenObtainPairSerializer, OTPSerializer, EmptySerializer)
+from .filters import filter_users, parse_user_filters
+from .pagination import UserListPagination
+from .revocation import CachedRefreshToken
+from .last_login import record_login
 
 from core.views import generate_tokens_for_user
+from core.outbox import enqueue_email
+from .rollups import PERIODS, get_dashboard_stats, get_order_stats
+from core.utils.params import parse_bool_param
+from decimal import Decimal
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.utils import timezone
 import logging
 
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 from rest_framework_simplejwt.utils import aware_utcnow
 
 
@@ -41,13 +49,11 @@ class RegisterView(APIView):
             otp = OTP.create_otp_for_user(user)
             otp_code = otp.generate_otp()
             
-            # Send OTP via email
-            send_mail(
+            # Queue OTP email (sent by the outbox dispatcher)
+            enqueue_email(
                 'Your OTP for Account Verification',
                 f'Your OTP is: {otp_code}',
-                settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=False,
             )
             
             return Response({
@@ -81,7 +87,7 @@ class VerifyOTPView(APIView):
                 user.save()
                 
 
-                refresh = RefreshToken.for_user(user)
+                refresh = MyTokenObtainPairSerializer.get_token(user)
                 
                 response = Response({
                     'message': 'OTP verified successfully.',
@@ -124,7 +130,8 @@ class LoginView(APIView):
             email = request.data.get('email')
             password = request.data.get('password')
             
-            user = authenticate(email=email, password=password)
+            # The only password hash of the request; tokens are minted for this user directly
+            user = authenticate(request, email=email, password=password)
             
             if user is None:
                 return Response(
@@ -137,9 +144,9 @@ class LoginView(APIView):
                     {'error': 'Account not verified. Please verify your email.'},
                     status=status.HTTP_401_UNAUTHORIZED
                 )
-            serializer = self.serializer_class(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            tokens = serializer.validated_data
+            refresh = self.serializer_class.get_token(user)
+            record_login(user)
+            tokens = {'refresh': str(refresh), 'access': str(refresh.access_token)}
             
             response = Response({
                 'access': tokens['access'],
@@ -172,22 +179,82 @@ class UserProfileView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class AdminDashboardView(APIView):
-    serializer_class = UserSerializer
+    serializer_class = AdminUserSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UserListPagination
     
     def get(self, request):
+        """
+        List users newest first, keyset-paginated, filtered by is_active,
+        is_admin, created_from/created_to and email prefix (admin only).
+        ?with_orders=true adds order_count and lifetime_spend.
+        """
         if not request.user.is_admin:
             return Response(
                 {'error': 'You are not authorized to access this resource.'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = self.pagination_class()
+        users = paginator.paginate_queryset(
+            filter_users(User.objects.all(), parse_user_filters(request.query_params)),
+            request,
+            view=self
+        )
+        data = AdminUserSerializer(users, many=True).data
+        if parse_bool_param('with_orders', request.query_params.get('with_orders')):
+            order_stats = get_order_stats([user.id for user in users])
+            for row in data:
+                row.update(order_stats.get(row['id'], {'order_count': 0, 'lifetime_spend': Decimal('0')}))
+        return paginator.get_paginated_response(data)
     
 
 
+class AdminDashboardStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = EmptySerializer
+    
+    def get(self, request):
+        """Get revenue, orders by status, top products and new users per day/week/month (admin only)"""
+        if not request.user.is_admin:
+            return Response(
+                {'error': 'You are not authorized to access this resource.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        period = request.query_params.get('period', 'day')
+        if period not in PERIODS:
+            return Response(
+                {'error': f'period must be one of {list(PERIODS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        end = timezone.localdate()
+        start = end - timedelta(days=settings.DASHBOARD_DEFAULT_DAYS - 1)
+        try:
+            if request.query_params.get('end'):
+                end = date.fromisoformat(request.query_params['end'])
+            if request.query_params.get('start'):
+                start = date.fromisoformat(request.query_params['start'])
+        except ValueError:
+            return Response(
+                {'error': 'start and end must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'error': 'start must not be after end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        cache_key = f'dashboard-stats:{period}:{start}:{end}'
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = get_dashboard_stats(start, end, period)
+            cache.set(cache_key, stats, settings.DASHBOARD_STATS_CACHE_TIMEOUT)
+        return Response(stats, status=status.HTTP_200_OK)
+
+
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]  # Changed from AllowAny
     serializer_class = EmptySerializer
@@ -196,7 +263,7 @@ class LogoutView(APIView):
             # Get refresh token from cookie and blacklist it
             refresh_token = request.COOKIES.get(settings.SIMPLE_JWT['AUTH_COOKIE_REFRESH'])
             if refresh_token:
-                refresh = RefreshToken(refresh_token)
+                refresh = CachedRefreshToken(refresh_token)
                 refresh.blacklist()
         except (TokenError, Exception) as e:
             logger.warning(f"Logout token blacklist issue: {e}")
@@ -221,16 +288,13 @@ class RefreshTokenView(APIView):
             if not refresh_token:
                 return Response({'error': 'Refresh token missing'}, status=401)
 
-            # 2. Verify and decode the refresh token
-            refresh = RefreshToken(refresh_token, verify=True)
+            # 2. Verify and decode the refresh token; verification also rejects
+            # revoked tokens, hitting the DB only for JTIs in the revocation set
+            refresh = CachedRefreshToken(refresh_token, verify=True)
             
             # Verify token type is refresh
             if refresh.payload.get('token_type') != 'refresh':
                 return Response({'error': 'Invalid token type'}, status=401)
-            
-            # Check if token is already blacklisted
-            if BlacklistedToken.objects.filter(token__jti=refresh['jti']).exists():
-                return Response({'error': 'Token has been revoked'}, status=401)
 
             user_id = refresh.payload.get('user_id')
             
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches over one reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = dispatch_outbox(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Processed {processed} emails')
+            if processed < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.retention import RETENTION_RULES, prune
+
+
+class Command(BaseCommand):
+    help = 'Delete expired tokens, password resets and OTPs in small batches (safe to run under live traffic)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches')
+        parser.add_argument('--only', choices=list(RETENTION_RULES), action='append', help='Prune only these tables')
+
+    def handle(self, *args, **options):
+        for name in options['only'] or RETENTION_RULES:
+            deleted, elapsed = prune(name, options['batch_size'], options['pause'])
+            rate = deleted / elapsed if elapsed else 0
+            self.stdout.write(f'{name}: deleted {deleted} rows in {elapsed:.2f}s ({rate:.0f} rows/s)')
@@ -0,0 +1,119 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, body, recipients, html_message=None, from_email=None):
+    """
+    Queue an email in the current transaction; dispatch_outbox sends it after
+    commit, so a slow or failing SMTP server can't block or roll back the request.
+    With EMAIL_OUTBOX_ENABLED = False the email is sent synchronously instead.
+    """
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    recipients = list(recipients)
+    if not getattr(settings, 'EMAIL_OUTBOX_ENABLED', True):
+        send_mail(subject, body, from_email, recipients, html_message=html_message, fail_silently=False)
+        return None
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_message or '',
+        from_email=from_email,
+        to=recipients,
+    )
+
+
+def enqueue_emails(messages):
+    """
+    Queue many emails with a single INSERT. messages is an iterable of dicts
+    with enqueue_email's arguments (subject, body, recipients, html_message).
+    """
+    if not getattr(settings, 'EMAIL_OUTBOX_ENABLED', True):
+        for message in messages:
+            enqueue_email(**message)
+        return []
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=message['subject'],
+            body=message['body'],
+            html_body=message.get('html_message') or '',
+            from_email=message.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+            to=list(message['recipients']),
+        )
+        for message in messages
+    ])
+
+
+def get_retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.to, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def dispatch_outbox(batch_size=100):
+    """
+    Send one batch of due emails over a single SMTP connection. Failures are
+    retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, then the
+    email is marked failed. Returns the number of emails processed.
+    """
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    with transaction.atomic():
+        # Concurrent dispatchers skip each other's rows instead of double sending
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if not emails:
+            return 0
+
+        backend = getattr(settings, 'EMAIL_OUTBOX_BACKEND', None) or settings.EMAIL_BACKEND
+        connection = get_connection(backend=backend)
+        try:
+            connection.open()
+            for email in emails:
+                email.attempts += 1
+                try:
+                    connection.send_messages([build_message(email, connection)])
+                except Exception as e:
+                    logger.warning(f"Outbox email {email.id} failed (attempt {email.attempts}): {e}")
+                    email.last_error = str(e)
+                    if email.attempts >= max_attempts:
+                        email.status = 'failed'
+                    else:
+                        email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+                else:
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+        except Exception as e:
+            # Could not even connect: push the whole batch back
+            logger.error(f"Outbox connection failed: {e}")
+            for email in emails:
+                if email.status == 'pending':
+                    email.last_error = str(e)
+                    email.next_attempt_at = timezone.now() + get_retry_delay(max(email.attempts, 1))
+        finally:
+            connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return len(emails)
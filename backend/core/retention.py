@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from adminpanel.models import OTP
+from profiles.models import PasswordReset
+
+
+def expired_tokens(now):
+    # Deleting an outstanding token cascades to its BlacklistedToken row
+    return OutstandingToken.objects.filter(expires_at__lt=now - settings.TOKEN_RETENTION)
+
+
+def expired_password_resets(now):
+    return PasswordReset.objects.filter(expires_at__lt=now - settings.PASSWORD_RESET_RETENTION)
+
+
+def expired_otps(now):
+    return OTP.objects.filter(otp_created__lt=now - settings.OTP_RETENTION)
+
+
+# name -> queryset of rows that may be deleted
+RETENTION_RULES = {
+    'tokens': expired_tokens,
+    'password_resets': expired_password_resets,
+    'otps': expired_otps,
+}
+
+
+def prune_batch(queryset, batch_size, after_id=0):
+    """
+    Delete up to batch_size rows of queryset with id > after_id, in their own
+    short transaction. Walking ids in order keeps each batch an index range
+    scan and lets a later run pick up where an interrupted one stopped.
+    Returns (rows deleted including cascades, last id or None when done).
+    """
+    ids = list(
+        queryset.filter(id__gt=after_id).order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0, None
+    with transaction.atomic():
+        # Re-apply the expiry filter in case a row was extended since it was selected
+        deleted, _ = queryset.filter(id__in=ids).delete()
+    return deleted, ids[-1]
+
+
+def prune(name, batch_size=1000, pause=0.0, now=None):
+    """Delete every expired row for one rule in bounded batches. Returns (rows deleted, seconds)."""
+    queryset = RETENTION_RULES[name](now or timezone.now())
+    started = time.monotonic()
+    total = 0
+    last_id = 0
+    while True:
+        deleted, last_id = prune_batch(queryset, batch_size, last_id)
+        total += deleted
+        if last_id is None:
+            break
+        if pause:
+            # Give live traffic room between batches
+            time.sleep(pause)
+    return total, time.monotonic() - started
+
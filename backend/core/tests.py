@@ -1,3 +1,127 @@
-from django.test import TestCase
+from contextlib import aclosing
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from adminpanel.models import OTP, User
+from .models import OutboundEmail
+from .outbox import dispatch_outbox, enqueue_email
+from .retention import prune, prune_batch, expired_tokens
+from .utils.streaming import BatchedStreamingHttpResponse
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP unavailable')
+
+
+@override_settings(
+    EMAIL_OUTBOX_ENABLED=True,
+    EMAIL_OUTBOX_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTests(TestCase):
+    def test_enqueue_does_not_send(self):
+        enqueue_email('Hello', 'Body', ['a@example.com'], html_message='<p>Body</p>')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 1)
+
+    def test_dispatch_sends_due_emails(self):
+        for i in range(3):
+            enqueue_email(f'Hello {i}', 'Body', [f'user{i}@example.com'], html_message='<p>Body</p>')
+
+        self.assertEqual(dispatch_outbox(batch_size=10), 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 3)
+        self.assertEqual(dispatch_outbox(batch_size=10), 0)
+
+    @override_settings(EMAIL_OUTBOX_BACKEND='core.tests.FailingBackend', EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        email = enqueue_email('Hello', 'Body', ['a@example.com'])
+
+        self.assertEqual(dispatch_outbox(), 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('SMTP unavailable', email.last_error)
+        # Not due yet
+        self.assertEqual(dispatch_outbox(), 0)
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        dispatch_outbox()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+    @override_settings(EMAIL_OUTBOX_ENABLED=False)
+    def test_disabled_outbox_sends_synchronously(self):
+        with self.settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            self.assertIsNone(enqueue_email('Hello', 'Body', ['a@example.com']))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('customer', 'customer@example.com', 'password', is_active=True)
+
+    def test_prunes_only_expired_tokens_with_their_blacklist_rows(self):
+        for _ in range(5):
+            RefreshToken.for_user(self.user).blacklist()
+        RefreshToken.for_user(self.user)
+        later = timezone.now() + timedelta(days=30)
+        fresh = RefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(jti=fresh['jti']).update(expires_at=later + timedelta(days=30))
+
+        deleted, _ = prune('tokens', batch_size=2, now=later)
+        self.assertEqual(deleted, 11)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [fresh['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_batches_resume_after_the_last_id(self):
+        for _ in range(3):
+            RefreshToken.for_user(self.user)
+        queryset = expired_tokens(timezone.now() + timedelta(days=30))
+        deleted, last_id = prune_batch(queryset, 2)
+        self.assertEqual(deleted, 2)
+        self.assertEqual(prune_batch(queryset, 2, last_id)[0], 1)
+        self.assertEqual(prune_batch(queryset, 2, last_id + 1), (0, None))
+
+    def test_prunes_old_otps(self):
+        OTP.create_otp_for_user(self.user)
+        self.assertEqual(prune('otps')[0], 0)
+        self.assertEqual(prune('otps', now=timezone.now() + timedelta(days=2))[0], 1)
+
+
+class BatchedStreamingHttpResponseTests(SimpleTestCase):
+    def test_asgi_iteration_fetches_one_batch_at_a_time(self):
+        produced = []
+
+        def parts():
+            for i in range(5):
+                produced.append(i)
+                yield f'{i}\n'
+
+        response = BatchedStreamingHttpResponse(parts(), batch_size=2)
+
+        async def first_part():
+            async with aclosing(response.__aiter__()) as content:
+                return await anext(content)
+
+        self.assertEqual(async_to_sync(first_part)(), b'0\n')
+        self.assertEqual(produced, [0, 1])
+
+    def test_wsgi_and_asgi_yield_the_same_bytes(self):
+        async def consume(response):
+            return [part async for part in response.__aiter__()]
+
+        sync_body = b''.join(BatchedStreamingHttpResponse(['a', 'b', 'c'], batch_size=2))
+        async_body = b''.join(async_to_sync(consume)(BatchedStreamingHttpResponse(['a', 'b', 'c'], batch_size=2)))
+        self.assertEqual(sync_body, b'abc')
+        self.assertEqual(async_body, b'abc')
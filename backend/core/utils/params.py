@@ -0,0 +1,37 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers
+
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+
+def parse_datetime_param(name, value, end_of_day=False):
+    """Accept an ISO date (whole day) or datetime; naive values use the current timezone."""
+    try:
+        parsed = parse_datetime(value)
+        day = parse_date(value) if parsed is None else None
+    except ValueError:
+        # Well formed but impossible, e.g. 2024-02-30
+        parsed = day = None
+    if parsed is None:
+        if day is None:
+            raise serializers.ValidationError({name: 'Expected an ISO date or datetime.'})
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_bool_param(name, value):
+    """true/false style query parameter; None when absent or empty."""
+    if value is None or value == '':
+        return None
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise serializers.ValidationError({name: 'Expected true or false.'})
@@ -0,0 +1,35 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+
+class BatchedStreamingHttpResponse(StreamingHttpResponse):
+    """
+    StreamingHttpResponse over a sync iterator that also streams under ASGI.
+
+    Django serves a sync iterator to ASGI by collecting all of it with
+    sync_to_async(list) before sending the first byte, which turns an export
+    of a whole .iterator() queryset back into one in-memory list. Here the
+    ASGI path pulls batch_size parts at a time on the request's sync thread
+    (thread_sensitive, so the cursor stays on the connection that opened it)
+    and sends each batch before fetching the next. WSGI iterates as usual.
+    """
+
+    batch_size = 500
+
+    def __init__(self, streaming_content=(), *args, batch_size=None, **kwargs):
+        super().__init__(streaming_content, *args, **kwargs)
+        if batch_size is not None:
+            self.batch_size = batch_size
+
+    async def __aiter__(self):
+        if self.is_async:
+            async for part in super().__aiter__():
+                yield part
+            return
+        parts = iter(self.streaming_content)
+        next_batch = sync_to_async(lambda: list(islice(parts, self.batch_size)), thread_sensitive=True)
+        while batch := await next_batch():
+            for part in batch:
+                yield part
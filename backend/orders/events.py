@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'order_status'
+
+
+def order_status_event(order):
+    """The payload pushed to subscribers; same shape as OrderStatusView."""
+    return {
+        'order_number': order.order_number,
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'last_updated': order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+class OrderEventBroker:
+    """
+    In-process fan-out of order status events to the SSE streams of this worker.
+
+    Each subscriber is an asyncio.Queue bound to the event loop it was created
+    on; publish() may be called from any thread. An idle subscriber costs one
+    queue and one suspended coroutine, so thousands per worker are cheap.
+    """
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(self.max_queue_size))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscriptions:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # Loop already closed; the stream is going away
+                pass
+
+    @staticmethod
+    def _put(queue, event):
+        if queue.full():
+            # A stalled client only needs the latest status, drop the oldest
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+broker = OrderEventBroker()
+
+
+class PostgresListener(threading.Thread):
+    """
+    LISTENs on CHANNEL over a dedicated connection and hands notifications to
+    the local broker, so a change committed by any worker reaches every
+    worker's subscribers. Reconnects after connection errors.
+    """
+
+    def __init__(self, broker, poll_timeout=5, retry_delay=1):
+        super().__init__(name='order-events-listener', daemon=True)
+        self.broker = broker
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            listener = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                listener.ensure_connection()
+                listener.set_autocommit(True)
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                self.listen(listener.connection)
+            except Exception:
+                logger.exception("Order events listener failed, reconnecting")
+                self._stop_event.wait(self.retry_delay)
+            finally:
+                listener.close()
+
+    def listen(self, raw_connection):
+        while not self._stop_event.is_set():
+            if select.select([raw_connection], [], [], self.poll_timeout) == ([], [], []):
+                continue
+            raw_connection.poll()
+            while raw_connection.notifies:
+                notification = raw_connection.notifies.pop(0)
+                try:
+                    message = json.loads(notification.payload)
+                except ValueError:
+                    continue
+                self.broker.publish(message['user_id'], message['event'])
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """Start this process's LISTEN thread on first subscription (Postgres only)."""
+    global _listener
+    if connection.vendor != 'postgresql':
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = PostgresListener(broker)
+            _listener.start()
+
+
+def publish_order_status(order):
+    """
+    Push order's current status to its owner's streams once the surrounding
+    transaction commits. On Postgres this is a NOTIFY, which the database
+    itself delivers at commit to every worker's listener; elsewhere the event
+    only reaches subscribers in this process.
+    """
+    event = order_status_event(order)
+    if connection.vendor == 'postgresql':
+        payload = json.dumps({'user_id': order.user_id, 'event': event})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+    else:
+        transaction.on_commit(lambda: broker.publish(order.user_id, event))
+
+
+def publish_order_statuses(orders):
+    """publish_order_status for many orders; a single pg_notify query on Postgres."""
+    messages = [(order.user_id, order_status_event(order)) for order in orders]
+    if not messages:
+        return
+    if connection.vendor == 'postgresql':
+        payloads = [json.dumps({'user_id': user_id, 'event': event}) for user_id, event in messages]
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload', [CHANNEL, payloads])
+    else:
+        def publish():
+            for user_id, event in messages:
+                broker.publish(user_id, event)
+        transaction.on_commit(publish)
+
+def format_event(event):
+    return f"event: status\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_order_events(user_id, order_number=None, keepalive=15):
+    """
+    SSE body for one client: the current status of order_number (if given),
+    then every status change of the user's orders, with a comment line every
+    keepalive seconds so proxies don't drop an idle stream. The subscription
+    is removed when the client disconnects and the generator is closed.
+    """
+    ensure_listener()
+    subscription = broker.subscribe(user_id)
+    queue = subscription[1]
+    try:
+        yield 'retry: 5000\n\n'
+        if order_number:
+            # Subscribed first, so a change racing this snapshot is still sent
+            order = await Order.objects.filter(user_id=user_id, order_number=order_number).afirst()
+            if order is not None:
+                yield format_event(order_status_event(order))
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if order_number and event['order_number'] != order_number:
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(user_id, subscription)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def get_request_hash(request):
+    """Fingerprint of path and body, so a key reused for a different request is rejected."""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f'{request.path}\n{body}'.encode()).hexdigest()
+
+
+def replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def claim_key(user, key, request_hash):
+    """
+    Insert the key row, or return the stored record if one exists.
+
+    The insert happens in the caller's transaction, so a concurrent request with
+    the same key blocks on the unique index until the first one commits (then
+    gets its stored response) or rolls back (then runs itself).
+    """
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                user=user, key=key, request_hash=request_hash, response_status=0, response_body={}
+            )
+        return None
+    except IntegrityError:
+        return IdempotencyKey.objects.get(user=user, key=key)
+
+
+def idempotent(view_method):
+    """
+    Make an APIView POST handler honour the Idempotency-Key header.
+
+    A replay returns the stored status and body without running the view, so
+    cart, stock and payments are untouched. Server errors aren't stored: the
+    row goes away with the rolled-back transaction and the client can retry
+    with the same key.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        request_hash = get_request_hash(request)
+        # Fast path: a completed request is replayed with a single SELECT
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is None or is_expired(record):
+            with transaction.atomic():
+                if record is not None:
+                    # Expired but not purged yet: treat the key as new
+                    IdempotencyKey.objects.filter(pk=record.pk).delete()
+                record = claim_key(request.user, key, request_hash)
+                if record is None:
+                    return run_and_store(view_method, self, request, key, *args, **kwargs)
+
+        if record.request_hash != request_hash:
+            return Response(
+                {'error': f'{HEADER} was already used for a different request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return replay(record)
+    return wrapper
+
+
+def is_expired(record):
+    return record.created_at < timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+
+
+def run_and_store(view_method, view, request, key, *args, **kwargs):
+    """Run the view inside the transaction holding the freshly inserted key row."""
+    response = view_method(view, request, *args, **kwargs)
+    if response.status_code >= 500:
+        transaction.set_rollback(True)
+        return response
+    IdempotencyKey.objects.filter(user=request.user, key=key).update(
+        response_status=response.status_code,
+        response_body=response.data,
+    )
+    return response
+
+
+def purge_idempotency_keys(batch_size=1000, now=None):
+    """Delete up to batch_size keys older than IDEMPOTENCY_KEY_TTL. Returns the number deleted."""
+    cutoff = (now or timezone.now()) - settings.IDEMPOTENCY_KEY_TTL
+    ids = list(
+        IdempotencyKey.objects.filter(created_at__lt=cutoff)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    IdempotencyKey.objects.filter(id__in=ids).delete()
+    return len(ids)
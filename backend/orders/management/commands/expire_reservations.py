@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.stock import expire_reservations
+
+
+class Command(BaseCommand):
+    help = 'Cancel pending orders whose stock reservation has expired and restore their stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep(options['batch_size'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        started = time.monotonic()
+        total = 0
+        while True:
+            expired = expire_reservations(batch_size)
+            total += expired
+            if expired < batch_size:
+                break
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(f'Expired {total} orders in {elapsed:.2f}s ({rate:.0f} orders/s)')
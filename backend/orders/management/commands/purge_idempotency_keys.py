@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            deleted = purge_idempotency_keys(options['batch_size'])
+            total += deleted
+            if deleted < options['batch_size']:
+                break
+        self.stdout.write(f'Deleted {total} idempotency keys')
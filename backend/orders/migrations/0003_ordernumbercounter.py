@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:31
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_today_counter(apps, schema_editor):
+    # Continue after numbers already issued today by the old last-order+1 scheme
+    Order = apps.get_model('orders', 'Order')
+    OrderNumberCounter = apps.get_model('orders', 'OrderNumberCounter')
+    today = timezone.localdate()
+    prefix = f'ORD{today:%Y%m%d}'
+    numbers = Order.objects.filter(order_number__startswith=prefix).values_list('order_number', flat=True)
+    last_value = max((int(number[len(prefix):]) for number in numbers), default=0)
+    if last_value:
+        OrderNumberCounter.objects.update_or_create(day=today, defaults={'last_value': last_value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_orderitem_product_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_today_counter, migrations.RunPython.noop),
+    ]
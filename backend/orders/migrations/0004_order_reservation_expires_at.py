@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_ordernumbercounter'),
+        ('profiles', '0002_passwordreset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='reservation_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'reservation_expires_at'], name='order_status_expiry_idx'),
+        ),
+    ]
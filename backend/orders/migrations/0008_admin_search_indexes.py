@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_status_created_idx'),
+        ('profiles', '0002_passwordreset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['total_amount'], name='order_total_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['utr_number'], name='payment_utr_number_idx'),
+        ),
+    ]
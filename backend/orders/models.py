@@ -1,4 +1,8 @@
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F, Sum
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
@@ -15,13 +19,27 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart #{self.id} - {self.user.email}"
 
+    def get_totals(self):
+        """total_items and total_price computed by the database in one aggregate query"""
+        totals = self.items.aggregate(
+            total_items=Sum('quantity'),
+            total_price=Sum(
+                F('quantity') * F('product__price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+        return {
+            'total_items': totals['total_items'] or 0,
+            'total_price': totals['total_price'] or Decimal('0.00'),
+        }
+
     @property
     def total_price(self):
-        return sum(item.total_price for item in self.items.all())
+        return self.get_totals()['total_price']
 
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals()['total_items']
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -53,6 +71,19 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     shipping_address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True, related_name='orders')
+    # Stock held by a pending_verification order is released after this (see expire_reservations)
+    reservation_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'reservation_expires_at'], name='order_status_expiry_idx'),
+            # Customer order history: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+            # Admin queues: WHERE status = ? ORDER BY created_at, id
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+            # Admin search by amount
+            models.Index(fields=['total_amount'], name='order_total_amount_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.order_number} - {self.user.email} - {self.status}"
@@ -60,18 +91,19 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         if not self.order_number:
             # Generate order number (e.g., ORD202312010001)
-            from datetime import datetime
-            date_str = datetime.now().strftime('%Y%m%d')
-            last_order = Order.objects.filter(order_number__startswith=f'ORD{date_str}').order_by('order_number').last()
-            if last_order:
-                last_num = int(last_order.order_number[-4:])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            self.order_number = f'ORD{date_str}{new_num:04d}'
+            from .numbering import allocate_order_number
+            self.order_number = allocate_order_number()
         
         super().save(*args, **kwargs)
 
+class OrderNumberCounter(models.Model):
+    """Last order number handed out per day; advanced in blocks by orders.numbering."""
+    day = models.DateField(unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
@@ -122,5 +154,28 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Admin search by exact UTR
+            models.Index(fields=['utr_number'], name='payment_utr_number_idx'),
+        ]
+
+    def __str__(self):
+        return f"Payment for Order #{self.order.order_number} - {self.get_payment_method_display()} - {self.status}"
+
+class IdempotencyKey(models.Model):
+    """Stored response for an Idempotency-Key sent to an order creation endpoint (see orders.idempotency)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+
     def __str__(self):
-        return f"Payment for Order #{self.order.order_number} - {self.get_payment_method_display()} - {self.status}"
\ No newline at end of file
+        return f"{self.key} ({self.user_id}) -> {self.response_status}"
@@ -0,0 +1,94 @@
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connection, connections
+from django.utils import timezone
+
+from .models import OrderNumberCounter
+
+UPSERT_SQL = (
+    'INSERT INTO {table} (day, last_value) VALUES (%s, %s) '
+    'ON CONFLICT (day) DO UPDATE SET last_value = {table}.last_value + EXCLUDED.last_value '
+    'RETURNING last_value'
+)
+
+
+def format_order_number(day, number):
+    # ORD{YYYYMMDD}{NNNN}; grows past four digits instead of wrapping after 9999/day
+    return f'ORD{day:%Y%m%d}{number:04d}'
+
+
+class OrderNumberAllocator:
+    """
+    Hands out ORD{YYYYMMDD}{N} numbers from a per-day counter row.
+
+    On Postgres each process reserves a block of numbers with one atomic upsert
+    on its own autocommit connection, so the counter row is locked for a
+    single statement rather than for a whole checkout transaction, and a
+    rolled-back checkout can never hand the same block out twice. Numbers are
+    unique but may have gaps (unused blocks are dropped on restart).
+
+    The private connection follows CONN_MAX_AGE and is reopened (once per
+    reservation) if it was dropped, e.g. by a database restart.
+
+    Other databases get one number at a time inside the caller's transaction.
+    """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._day = None
+        self._next = 0
+        self._end = -1
+
+    def get_block_size(self):
+        return self.block_size or getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 20)
+
+    def _upsert(self, cursor, day, count):
+        table = connection.ops.quote_name(OrderNumberCounter._meta.db_table)
+        cursor.execute(UPSERT_SQL.format(table=table), [connection.ops.adapt_datefield_value(day), count])
+        return cursor.fetchone()[0]
+
+    def _get_private_connection(self):
+        private = getattr(self._local, 'connection', None)
+        if private is None:
+            private = connections.create_connection(DEFAULT_DB_ALIAS)
+            self._local.connection = private
+        return private
+
+    def _reserve_block(self, day, size):
+        private = self._get_private_connection()
+        private.close_if_unusable_or_obsolete()
+        try:
+            with private.cursor() as cursor:
+                return self._upsert(cursor, day, size)
+        except (InterfaceError, OperationalError):
+            # Stale connection: reconnect and retry once. If the first upsert
+            # did commit, its block is simply skipped
+            private.close()
+            with private.cursor() as cursor:
+                return self._upsert(cursor, day, size)
+
+    def next_number(self, day=None):
+        day = day or timezone.localdate()
+        if connection.vendor != 'postgresql':
+            with connection.cursor() as cursor:
+                return format_order_number(day, self._upsert(cursor, day, 1))
+
+        with self._lock:
+            if self._day != day or self._next > self._end:
+                size = self.get_block_size()
+                self._end = self._reserve_block(day, size)
+                self._next = self._end - size + 1
+                self._day = day
+            number = self._next
+            self._next += 1
+        return format_order_number(day, number)
+
+
+allocator = OrderNumberAllocator()
+
+
+def allocate_order_number():
+    return allocator.next_number()
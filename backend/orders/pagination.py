@@ -0,0 +1,8 @@
+from core.utils.pagination import KeysetPagination
+
+
+class OrderHistoryPagination(KeysetPagination):
+    """Newest orders first, paged on (created_at, id) so deep history stays cheap."""
+    page_size = 20
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
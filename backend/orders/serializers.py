@@ -1,16 +1,20 @@
 from rest_framework import serializers
 from .models import CartItem, Order, OrderItem, Payment
 from profiles.models import Address
+from products.images import display_image
 
 class CartItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
-    product_image = serializers.CharField(source='product.image', read_only=True)
+    product_image = serializers.SerializerMethodField()
     product_price = serializers.DecimalField(source='product.price', read_only=True, max_digits=10, decimal_places=2)
     total_price = serializers.DecimalField(read_only=True, max_digits=10, decimal_places=2)
     
     class Meta:
         model = CartItem
         fields = ['id', 'product', 'product_name', 'product_price', 'quantity', 'total_price','product_image']
+    
+    def get_product_image(self, obj) -> str:
+        return display_image(obj.product) or ''
 
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,10 +1,11 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.apps import apps
 
+from core.outbox import enqueue_email
+
 @receiver(post_save, sender='orders.Order')  # Use string reference to avoid import
 def send_admin_order_notification(sender, instance, created, **kwargs):
     """Send email to admins when a new order is created"""
@@ -30,11 +31,5 @@ def send_admin_order_notification(sender, instance, created, **kwargs):
         text_content = render_to_string('emails/admin_order_notification.txt', context)
         
         subject = f'New Order Received: {instance.order_number}'
-        email = EmailMultiAlternatives(
-            subject,
-            text_content,
-            settings.DEFAULT_FROM_EMAIL,
-            list(admin_emails)
-        )
-        email.attach_alternative(html_content, "text/html")
-        email.send(fail_silently=False)
\ No newline at end of file
+        # Queued in the checkout transaction; sent by the outbox dispatcher
+        enqueue_email(subject, text_content, admin_emails, html_message=html_content)
@@ -0,0 +1,125 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.http import Http404
+from django.utils import timezone
+
+from adminpanel.rollups import record_status_changes
+from products.cache import bump_catalog_version
+from products.models import Product
+from .models import Order, OrderItem, Payment
+
+
+class InsufficientStock(Exception):
+    """Raised with one entry per short line: product_id, product_name, available, requested."""
+
+    def __init__(self, lines):
+        super().__init__(lines)
+        self.lines = lines
+
+    @property
+    def message(self):
+        return ' '.join(
+            f"Insufficient stock for {line['product_name']}. "
+            f"Available: {line['available']}, Requested: {line['requested']}."
+            for line in self.lines
+        )
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def reserve_stock(quantities):
+    """
+    Lock and decrement stock for {product_id: quantity} in a constant number of
+    queries. Must run inside a transaction. Products are locked in id order so
+    concurrent checkouts can't deadlock. Returns {product_id: Product} with the
+    pre-decrement rows, for pricing and OrderItem snapshots.
+    """
+    products = {
+        product.id: product
+        for product in Product.objects.select_for_update()
+        .filter(id__in=quantities)
+        .order_by('id')
+        .only('id', 'name', 'price', 'image', 'image_renditions', 'stock_quantity')
+    }
+    if len(products) != len(quantities):
+        raise Http404('Product not found')
+
+    short = [
+        {
+            'product_id': product_id,
+            'product_name': products[product_id].name,
+            'available': products[product_id].stock_quantity,
+            'requested': quantity,
+        }
+        for product_id, quantity in quantities.items()
+        if products[product_id].stock_quantity < quantity
+    ]
+    if short:
+        raise InsufficientStock(short)
+
+    # The stock >= qty guard keeps this safe even where rows can't be locked
+    guard = Q()
+    for product_id, quantity in quantities.items():
+        guard |= Q(id=product_id, stock_quantity__gte=quantity)
+    updated = Product.objects.filter(guard).update(
+        stock_quantity=F('stock_quantity') - _quantity_case(quantities)
+    )
+    if updated != len(quantities):
+        raise InsufficientStock([
+            {
+                'product_id': product_id,
+                'product_name': products[product_id].name,
+                'available': None,
+                'requested': quantity,
+            }
+            for product_id, quantity in quantities.items()
+        ])
+
+    transaction.on_commit(bump_catalog_version)
+    return products
+
+
+def restore_stock(order_items):
+    """Put the quantities of order_items (an OrderItem queryset) back in one UPDATE."""
+    quantities = {}
+    for product_id, quantity in order_items.filter(product__isnull=False).values_list('product_id', 'quantity'):
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
+        return
+    Product.objects.filter(id__in=quantities).update(
+        stock_quantity=F('stock_quantity') + _quantity_case(quantities)
+    )
+    transaction.on_commit(bump_catalog_version)
+
+
+def expire_reservations(batch_size=500, now=None):
+    """
+    Cancel up to batch_size pending orders whose reservation has expired, give
+    their stock back and fail their payments, all set-based in one transaction.
+    Rows locked by a concurrent sweeper or checkout are skipped, not waited on.
+    Returns the number of orders expired.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        order_ids = list(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(status='pending_verification', reservation_expires_at__lte=now)
+            .order_by('reservation_expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return 0
+        restore_stock(OrderItem.objects.filter(order_id__in=order_ids))
+        Order.objects.filter(id__in=order_ids).update(status='cancelled', updated_at=now)
+        record_status_changes(
+            Order.objects.filter(id__in=order_ids).only('id', 'status', 'created_at', 'total_amount'),
+            'pending_verification'
+        )
+        Payment.objects.filter(order_id__in=order_ids).update(status='failed', updated_at=now)
+    return len(order_ids)
@@ -1,3 +1,392 @@
-from django.test import TestCase
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from adminpanel.models import User
+from products.models import Product
+from profiles.models import Address
+from .events import OrderEventBroker, broker, stream_order_events
+from .idempotency import purge_idempotency_keys
+from .models import Cart, CartItem, IdempotencyKey, Order, OrderItem, OrderNumberCounter, Payment
+from .numbering import OrderNumberAllocator
+from .stock import expire_reservations
+
+
+def create_customer(index):
+    user = User.objects.create_user(f'customer{index}', f'customer{index}@example.com', 'password', is_active=True)
+    address = Address.objects.create(
+        user=user, phone='9999999999', street='1 Main St', city='Pune', state='MH', zip_code='411001'
+    )
+    return user, address
+
+
+class OrderNumberAllocatorTests(TransactionTestCase):
+    def test_numbers_are_sequential_per_day(self):
+        allocator = OrderNumberAllocator()
+        day = date(2025, 1, 31)
+        self.assertEqual(allocator.next_number(day), 'ORD202501310001')
+        self.assertEqual(allocator.next_number(day), 'ORD202501310002')
+        self.assertEqual(allocator.next_number(date(2025, 2, 1)), 'ORD202502010001')
+
+    def test_numbers_widen_past_9999_per_day(self):
+        day = date(2025, 1, 31)
+        OrderNumberCounter.objects.create(day=day, last_value=9999)
+        self.assertEqual(OrderNumberAllocator().next_number(day), 'ORD2025013110000')
+
+    def test_block_reservation_reconnects_after_a_dropped_connection(self):
+        allocator = OrderNumberAllocator()
+        private = allocator._get_private_connection()
+        self.addCleanup(private.close)
+        with mock.patch.object(allocator, '_upsert', side_effect=[OperationalError('server closed the connection'), 40]), \
+                mock.patch.object(private, 'close', wraps=private.close) as close:
+            self.assertEqual(allocator._reserve_block(date(2025, 1, 31), 20), 40)
+        close.assert_called_once()
+
+    def test_order_save_assigns_number(self):
+        user, address = create_customer(0)
+        order = Order.objects.create(user=user, total_amount=10, shipping_address=address)
+        self.assertRegex(order.order_number, r'^ORD\d{8}\d{4,}$')
+
+
+class CartDetailQueryCountTests(TestCase):
+    def setUp(self):
+        self.user, _ = create_customer(0)
+        self.cart = Cart.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, size):
+        for index in range(size):
+            product = Product.objects.create(
+                name=f'Product {index}', description='-', price=10 + index, stock_quantity=5
+            )
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+
+    def get_cart(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/orders/cart/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        self.fill_cart(1)
+        self.assertEqual(len(self.get_cart()['items']), 1)
+        self.fill_cart(10)
+        self.assertEqual(len(self.get_cart()['items']), 11)
+
+    def test_totals(self):
+        self.fill_cart(3)
+        data = self.get_cart()
+        self.assertEqual(data['total_items'], 6)
+        self.assertEqual(data['total_price'], float(2 * (10 + 11 + 12)))
+
+    def test_empty_cart(self):
+        data = self.get_cart()
+        self.assertEqual(data['total_items'], 0)
+        self.assertEqual(data['total_price'], 0.0)
+        self.assertEqual(data['items'], [])
+
+
+class OrderHistoryQueryCountTests(TestCase):
+    def setUp(self):
+        self.user, self.address = create_customer(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, count, items_per_order=3):
+        start = Order.objects.count()
+        orders = Order.objects.bulk_create([
+            Order(
+                user=self.user, order_number=f'ORD20250101{start + i:06d}',
+                total_amount=30, shipping_address=self.address,
+            )
+            for i in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_name=f'Item {j}', product_price=10, quantity=1, total_price=10)
+            for order in orders
+            for j in range(items_per_order)
+        ])
+        return orders
+
+    def test_list_and_detail_query_counts_are_flat(self):
+        for total in (1, 10, 1000):
+            self.create_orders(total - Order.objects.count())
+
+            with self.assertNumQueries(1):
+                response = self.client.get('/api/orders/order/', {'page_size': 100})
+            self.assertEqual(len(response.data['results']), min(total, 100))
+            self.assertEqual(response.data['next_cursor'] is not None, total > 100)
+
+            order = Order.objects.order_by('-id').first()
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/api/orders/order/{order.order_number}/')
+            self.assertEqual(len(response.data['items']), 3)
+            self.assertIn(self.user.email, response.data['shipping_address'])
+
+    def test_cursor_walks_all_orders_once(self):
+        self.create_orders(45)
+        seen = []
+        params = {'page_size': 20}
+        while True:
+            data = self.client.get('/api/orders/order/', params).data
+            seen += [order['order_number'] for order in data['results']]
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+
+
+class CheckoutStockTests(TestCase):
+    def setUp(self):
+        self.user, self.address = create_customer(0)
+        self.cart = Cart.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, *stock_and_quantities):
+        products = []
+        for index, (stock, quantity) in enumerate(stock_and_quantities):
+            product = Product.objects.create(name=f'Product {index}', description='-', price=10, stock_quantity=stock)
+            CartItem.objects.create(cart=self.cart, product=product, quantity=quantity)
+            products.append(product)
+        return products
+
+    def checkout(self):
+        return self.client.post(
+            '/api/orders/order/create/', {'address_id': self.address.id, 'payment_method': 'upi'}, format='json'
+        )
+
+    def stock(self, products):
+        return [product.stock_quantity for product in Product.objects.filter(pk__in=[p.pk for p in products]).order_by('id')]
+
+    def test_short_lines_are_reported_and_nothing_is_reserved(self):
+        products = self.fill_cart((5, 2), (1, 3), (0, 1))
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(line['product_id'], line['available'], line['requested']) for line in response.data['items']],
+            [(products[1].id, 1, 3), (products[2].id, 0, 1)],
+        )
+        self.assertEqual(self.stock(products), [5, 1, 0])
+        self.assertFalse(Order.objects.exists())
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        counts = []
+        for size in (1, 6):
+            self.cart.items.all().delete()
+            Order.objects.all().delete()
+            self.fill_cart(*[(5, 1)] * size)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.checkout().status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_cancel_restores_stock_once(self):
+        products = self.fill_cart((5, 2), (3, 3))
+        order_number = self.checkout().data['order']['order_number']
+        self.assertEqual(self.stock(products), [3, 0])
+
+        url = f'/api/orders/order/{order_number}/cancel/'
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.stock(products), [5, 3])
+        self.assertEqual(Payment.objects.get().status, 'failed')
+
+
+class ReservationExpiryTests(TestCase):
+    def setUp(self):
+        self.user, self.address = create_customer(0)
+        self.product = Product.objects.create(name='Mug', description='Mug', price=10, stock_quantity=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def purchase(self, quantity=1):
+        response = self.client.post(
+            '/api/orders/order/direct-purchase/',
+            {'address_id': self.address.id, 'payment_method': 'upi', 'product_id': self.product.id, 'quantity': quantity},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(order_number=response.data['order']['order_number'])
+
+    def test_expired_orders_are_cancelled_in_batches(self):
+        orders = []
+        for _ in range(4):
+            orders.append(self.purchase(2))
+            # A customer may only have one pending order at a time
+            Order.objects.filter(pk=orders[-1].pk).update(status='processing')
+        Order.objects.update(status='pending_verification')
+        later = timezone.now() + timedelta(days=1)
+        Order.objects.filter(pk=orders[0].pk).update(reservation_expires_at=None)
+        Order.objects.filter(pk=orders[1].pk).update(reservation_expires_at=later + timedelta(hours=1))
+
+        self.assertEqual([expire_reservations(batch_size=1, now=later) for _ in range(3)], [1, 1, 0])
+
+        statuses = dict(Order.objects.values_list('id', 'status'))
+        self.assertEqual(
+            [statuses[order.id] for order in orders],
+            ['pending_verification', 'pending_verification', 'cancelled', 'cancelled'],
+        )
+        payments = dict(Payment.objects.values_list('order_id', 'status'))
+        self.assertEqual([payments[order.id] for order in orders], ['pending', 'pending', 'failed', 'failed'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 6)
+
+    def test_cancel_after_expiry_does_not_restore_again(self):
+        order = self.purchase(3)
+        expire_reservations(now=timezone.now() + timedelta(days=1))
+        response = self.client.post(f'/api/orders/order/{order.order_number}/cancel/')
+        self.assertEqual(response.status_code, 400)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 10)
+
+    def test_expired_order_cannot_be_paid(self):
+        order = self.purchase()
+        expire_reservations(now=timezone.now() + timedelta(days=1))
+        response = self.client.post(f'/api/orders/payment/verify/{order.order_number}/', {'utr_number': '123456'})
+        self.assertEqual(response.status_code, 400)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user, self.address = create_customer(0)
+        self.product = Product.objects.create(name='Mug', description='Mug', price=100, stock_quantity=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def purchase(self, key, quantity=1):
+        return self.client.post(
+            '/api/orders/order/direct-purchase/',
+            {'address_id': self.address.id, 'payment_method': 'upi', 'product_id': self.product.id, 'quantity': quantity},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_stored_response(self):
+        first = self.purchase('retry-1')
+        self.assertEqual(first.status_code, 201)
+
+        with self.assertNumQueries(1):
+            retry = self.purchase('retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['order']['order_number'], first.data['order']['order_number'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 4)
+
+    def test_key_reused_for_different_request_is_rejected(self):
+        self.purchase('retry-1')
+        self.assertEqual(self.purchase('retry-1', quantity=2).status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_keys_are_purged(self):
+        self.purchase('retry-1')
+        self.assertEqual(purge_idempotency_keys(), 0)
+        self.assertEqual(purge_idempotency_keys(now=timezone.now() + timedelta(days=2)), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class OrderEventBrokerTests(SimpleTestCase):
+    def test_fan_out_with_5k_idle_subscribers(self):
+        async def run():
+            event_broker = OrderEventBroker()
+            subscriptions = [(i % 1000, event_broker.subscribe(i % 1000)) for i in range(5000)]
+            self.assertEqual(event_broker.subscriber_count(), 5000)
+
+            event_broker.publish(7, {'order_number': 'ORD1', 'status': 'confirmed'})
+            await asyncio.sleep(0)
+            delivered = [user_id for user_id, (_, queue) in subscriptions if not queue.empty()]
+            self.assertEqual(delivered, [7] * 5)
+
+            for user_id, subscription in subscriptions:
+                event_broker.unsubscribe(user_id, subscription)
+            self.assertEqual(event_broker.subscriber_count(), 0)
+
+        asyncio.run(run())
+
+
+class OrderStatusStreamTests(TransactionTestCase):
+    def create_order(self):
+        user, address = create_customer(0)
+        return user, Order.objects.create(user=user, total_amount=10, shipping_address=address)
+
+    def cancel(self, user, order):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(f'/api/orders/order/{order.order_number}/cancel/')
+
+    async def test_stream_sends_snapshot_then_changes(self):
+        user, order = await sync_to_async(self.create_order)()
+        stream = stream_order_events(user.id, order.order_number, keepalive=0.05)
+
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+        self.assertIn('"status": "pending_verification"', await anext(stream))
+        self.assertEqual(await anext(stream), ': keepalive\n\n')
+
+        response = await sync_to_async(self.cancel)(user, order)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('"status": "cancelled"', await asyncio.wait_for(anext(stream), 5))
+
+        await stream.aclose()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get('/api/orders/order/status-stream/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_is_refused_outside_asgi(self):
+        user, _ = self.create_order()
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/orders/order/status-stream/')
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentCheckoutTests(TransactionTestCase):
+    checkouts = 40
+
+    def checkout(self, user, address):
+        try:
+            client = APIClient()
+            client.force_authenticate(user)
+            return client.post(
+                '/api/orders/order/create/',
+                {'address_id': address.id, 'payment_method': 'upi'},
+                format='json'
+            )
+        finally:
+            connection.close()
+
+    def test_parallel_checkouts_get_unique_numbers_and_never_oversell(self):
+        product = Product.objects.create(name='Mug', description='Mug', price=100, stock_quantity=self.checkouts - 5)
+        customers = []
+        for index in range(self.checkouts):
+            user, address = create_customer(index)
+            CartItem.objects.create(cart=Cart.objects.create(user=user), product=product, quantity=1)
+            customers.append((user, address))
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(lambda customer: self.checkout(*customer), customers))
+
+        created = [r for r in responses if r.status_code == 201]
+        numbers = [r.data['order']['order_number'] for r in created]
+        self.assertEqual(len(created), self.checkouts - 5)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertTrue(all(r.status_code == 400 for r in responses if r.status_code != 201))
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 0)
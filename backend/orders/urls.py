@@ -14,6 +14,7 @@ urlpatterns = [
     path('order/pending-order/', views.PendingOrderDetailView.as_view(), name='pending-order-detail'),
     path('order/<str:order_number>/cancel/', views.CancelOrderView.as_view(), name='cancel-order'),
     path('order/', views.OrderListView.as_view(), name='order-list'),
+    path('order/status-stream/', views.OrderStatusStreamView.as_view(), name='order-status-stream'),
     path('order/<str:order_number>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('order/<str:order_number>/status/', views.OrderStatusView.as_view(), name='order-status'), 
     
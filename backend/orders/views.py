@@ -1,13 +1,26 @@
-from rest_framework import status, serializers
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views import View
 
 from .models import Cart, CartItem, Order, OrderItem, Payment
+from .stock import InsufficientStock, reserve_stock, restore_stock
+from .idempotency import idempotent
+from .pagination import OrderHistoryPagination
+from .events import publish_order_status, stream_order_events
 from products.models import Product
+from products.images import display_image
 from profiles.models import Address
+from adminpanel.authentication import ClaimsJWTAuthentication
 from .serializers import (
     CartItemSerializer, OrderSerializer, 
     OrderDetailSerializer, PaymentSerializer,
@@ -21,13 +34,14 @@ class CartDetailView(APIView):
     def get(self, request):
         """Get user's cart with all items"""
         cart, created = Cart.objects.get_or_create(user=request.user)
-        items = cart.items.all()
+        items = cart.items.select_related('product')
         serializer = CartItemSerializer(items, many=True)
+        totals = cart.get_totals()
         
         response_data = {
             'cart_id': cart.id,
-            'total_items': cart.total_items,
-            'total_price': float(cart.total_price),
+            'total_items': totals['total_items'],
+            'total_price': float(totals['total_price']),
             'items': serializer.data
         }
         return Response(response_data)
@@ -119,20 +133,23 @@ class RemoveCartItemView(APIView):
 class OrderListView(APIView):
     
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderHistoryPagination
 
     def get(self, request):
-        """Get all orders for the authenticated user"""
-        orders = Order.objects.filter(user=request.user).order_by('-created_at')
+        """Get the authenticated user's orders, newest first, one cursor page at a time"""
+        paginator = self.pagination_class()
+        orders = paginator.paginate_queryset(Order.objects.filter(user=request.user), request, view=self)
         serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
 class OrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OrderDetailSerializer
     def get(self, request, order_number):
         """Get detailed view of a specific order"""
+        # Address.__str__ reads address.user, so join it along with the address
         order = get_object_or_404(
-            Order, 
+            Order.objects.select_related('shipping_address__user').prefetch_related('items'),
             order_number=order_number, 
             user=request.user
         )
@@ -148,6 +165,7 @@ class OrderDetailView(APIView):
 class CreateOrderView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CreateOrderSerializer, OrderDetailSerializer, PaymentSerializer
+    @idempotent
     @transaction.atomic
     def post(self, request):
 
@@ -179,47 +197,53 @@ class CreateOrderView(APIView):
 
         # Get user's cart
         cart = get_object_or_404(Cart, user=request.user)
-        if cart.items.count() == 0:
+        quantities = {}
+        for product_id, quantity in cart.items.values_list('product_id', 'quantity'):
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        if not quantities:
             return Response(
                 {'error': 'Cart is empty'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         try:
-            address = Address.objects.get(id=address_id, user=request.user)
+            address = Address.objects.select_related('user').get(id=address_id, user=request.user)
         except Address.DoesNotExist:
             return Response(
                 {'error': 'Invalid address or address does not belong to you'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Lock and decrement stock for every line at once
+        try:
+            products = reserve_stock(quantities)
+        except InsufficientStock as e:
+            transaction.set_rollback(True)
+            return Response(
+                {'error': e.message, 'items': e.lines},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         # Create order
         order = Order.objects.create(
             user=request.user,
-            total_amount=cart.total_price,
-            shipping_address=address
+            total_amount=sum(products[pid].price * qty for pid, qty in quantities.items()),
+            shipping_address=address,
+            reservation_expires_at=timezone.now() + settings.ORDER_RESERVATION_TTL
         )
 
         # Create order items from cart items
-        for cart_item in cart.items.all():
-            if cart_item.product.stock_quantity < cart_item.quantity:
-                raise serializers.ValidationError(
-                    f"Insufficient stock for {cart_item.product.name}. "
-                    f"Available: {cart_item.product.stock_quantity}, "
-                    f"Requested: {cart_item.quantity}"
-                )
-            
-            # Reduce stock
-            cart_item.product.stock_quantity -= cart_item.quantity
-            cart_item.product.save()
-            OrderItem.objects.create(
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
-                product=cart_item.product,
-                product_name=cart_item.product.name,
-                product_price=cart_item.product.price,
-                product_image=str(cart_item.product.image) if cart_item.product.image else '',
-                quantity=cart_item.quantity,
-                total_price=cart_item.total_price
+                product=products[product_id],
+                product_name=products[product_id].name,
+                product_price=products[product_id].price,
+                product_image=display_image(products[product_id]) or '',
+                quantity=quantity,
+                total_price=products[product_id].price * quantity
             )
+            for product_id, quantity in quantities.items()
+        ])
 
         # Create payment record
         payment = Payment.objects.create(
@@ -246,6 +270,7 @@ class CreateOrderView(APIView):
 class DirectPurchaseView(APIView):
     permission_classes = [IsAuthenticated]
     serialiser_class = DirectPurchaseSerializer, OrderDetailSerializer, PaymentSerializer
+    @idempotent
     @transaction.atomic
     def post(self, request):
         """Direct purchase without adding to cart"""
@@ -274,20 +299,20 @@ class DirectPurchaseView(APIView):
 
         # Validate address
         try:
-            address = Address.objects.get(id=address_id, user=request.user)
+            address = Address.objects.select_related('user').get(id=address_id, user=request.user)
         except Address.DoesNotExist:
             return Response(
                 {'error': 'Invalid address'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get product
-        product = get_object_or_404(Product, id=product_id)
-        
-        # Check stock
-        if product.stock_quantity < quantity:
+        # Lock the product and reduce stock
+        try:
+            product = reserve_stock({product_id: quantity})[product_id]
+        except InsufficientStock as e:
+            transaction.set_rollback(True)
             return Response(
-                {'error': f'Insufficient stock for {product.name}. Available: {product.stock_quantity}'},
+                {'error': e.message, 'items': e.lines},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
@@ -295,7 +320,8 @@ class DirectPurchaseView(APIView):
         order = Order.objects.create(
             user=request.user,
             total_amount=product.price * quantity,
-            shipping_address=address
+            shipping_address=address,
+            reservation_expires_at=timezone.now() + settings.ORDER_RESERVATION_TTL
         )
 
         # Create order item
@@ -304,15 +330,11 @@ class DirectPurchaseView(APIView):
             product=product,
             product_name=product.name,
             product_price=product.price,
-            product_image=str(product.image) if product.image else '',
+            product_image=display_image(product) or '',
             quantity=quantity,
             total_price=product.price * quantity
         )
 
-        # Reduce stock
-        product.stock_quantity -= quantity
-        product.save()
-
         # Create payment
         payment = Payment.objects.create(
             order=order,
@@ -369,8 +391,9 @@ class CancelOrderView(APIView):
     @transaction.atomic
     def post(self, request, order_number):
         """Cancel an order that's pending verification"""
+        # Locked so a double submit or the reservation sweeper can't restore the stock twice
         order = get_object_or_404(
-            Order, 
+            Order.objects.select_for_update(),
             order_number=order_number, 
             user=request.user
         )
@@ -382,19 +405,15 @@ class CancelOrderView(APIView):
             )
         
         # Restore product stock
-        for order_item in order.items.all():
-            if order_item.product:
-                order_item.product.stock_quantity += order_item.quantity
-                order_item.product.save()
+        restore_stock(order.items.all())
         
         # Update order status
         order.status = 'cancelled'
         order.save()
+        publish_order_status(order)
         
         # Update payment status
-        if hasattr(order, 'payment'):
-            order.payment.status = 'failed'
-            order.payment.save()
+        Payment.objects.filter(order=order).update(status='failed')
         
         return Response(
             {'message': 'Order cancelled successfully'},
@@ -416,10 +435,13 @@ class PaymentMethodsView(APIView):
 class VerifyPaymentView(APIView):
     permission_classes = [IsAuthenticated]
     serialiser_class = PaymentSerializer
+    
+    @transaction.atomic
     def post(self, request, order_number):
         """Verify payment with screenshot and UTR number"""
+        # Locked so this can't overwrite a cancellation by the reservation sweeper
         order = get_object_or_404(
-            Order, 
+            Order.objects.select_for_update(),
             order_number=order_number, 
             user=request.user
         )
@@ -449,6 +471,7 @@ class VerifyPaymentView(APIView):
         payment.save()
         order.status = 'processing'
         order.save()
+        publish_order_status(order)
 
         # Order remains in pending_verification until admin approves
         return Response(
@@ -471,4 +494,46 @@ class OrderStatusView(APIView):
             'status': order.status,
             'status_display': order.get_status_display(),
             'last_updated': order.updated_at
-        })
\ No newline at end of file
+        })
+
+
+def authenticate_stream(request):
+    """JWT user for an SSE request; EventSource can't set headers, so ?token= is accepted too."""
+    authenticator = ClaimsJWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+class OrderStatusStreamView(View):
+    """
+    Server-Sent Events stream of status changes for the user's orders, in the
+    same shape as OrderStatusView; ?order=<order_number> limits it to one order.
+    Needs the ASGI application (admin/asgi.py): under WSGI or runserver Django
+    would collect the never-ending stream into a list, so those get a 501.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'error': 'The status stream is only served by the ASGI application'}, status=501)
+
+        user = await sync_to_async(authenticate_stream)(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication credentials were not provided or are invalid'}, status=401)
+
+        order_number = request.GET.get('order')
+        if order_number and not await Order.objects.filter(user=user, order_number=order_number).aexists():
+            return JsonResponse({'error': 'Order not found'}, status=404)
+
+        response = StreamingHttpResponse(
+            stream_order_events(user.id, order_number, keepalive=settings.ORDER_EVENTS_KEEPALIVE),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# Hit/miss counts are per process: counting in the shared cache would cost a
+# write (a file rewrite on the file backend) on every read, and incr() on the
+# file and database backends is a read-modify-write that loses updates
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _new_version():
+    # Seeded from the clock so a version evicted from the cache is never
+    # reused, which would serve stale payloads still within their TTL
+    return time.time_ns() // 1000
+
+
+def get_catalog_version():
+    return _cache().get_or_set(CATALOG_VERSION_KEY, _new_version, timeout=None)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog payload by moving to a new version."""
+    version = _new_version()
+    _cache().set(CATALOG_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def catalog_cache_key(kind, **params):
+    parts = [f'{name}={params[name]}' for name in sorted(params)]
+    return f"catalog:v{get_catalog_version()}:{kind}:{'&'.join(parts)}"
+
+
+def get_cached_payload(key):
+    payload = _cache().get(key)
+    with _stats_lock:
+        _stats['misses' if payload is None else 'hits'] += 1
+    return payload
+
+
+def set_cached_payload(key, payload):
+    _cache().set(key, payload, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+
+
+def get_catalog_cache_stats():
+    """The current version, and hit/miss counts since this process started."""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    return {'version': get_catalog_version(), 'hits': hits, 'misses': misses}
+
+
+def reset_catalog_cache_stats():
+    with _stats_lock:
+        _stats.clear()
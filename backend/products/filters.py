@@ -0,0 +1,123 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q
+from rest_framework import serializers
+
+from .cache import catalog_cache_key, get_cached_payload, set_cached_payload
+from .models import Product
+
+DEFAULT_PRICE_BUCKETS = [0, 500, 1000, 2500, 5000]
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def get_price_buckets():
+    """[(lower, upper), ...] with upper=None for the open-ended last bucket."""
+    bounds = [Decimal(str(b)) for b in getattr(settings, 'PRODUCT_PRICE_BUCKETS', DEFAULT_PRICE_BUCKETS)]
+    return list(zip(bounds, bounds[1:] + [None]))
+
+
+def parse_product_filters(params):
+    """Validate ?category=1,2&min_price=&max_price=&in_stock=true into a normalized dict."""
+    filters = {}
+
+    category = params.get('category')
+    if category:
+        try:
+            filters['category'] = sorted({int(pk) for pk in category.split(',') if pk})
+        except ValueError:
+            raise serializers.ValidationError({'category': 'Expected a comma separated list of category ids.'})
+
+    for name in ('min_price', 'max_price'):
+        value = params.get(name)
+        if value:
+            try:
+                filters[name] = Decimal(value)
+            except InvalidOperation:
+                raise serializers.ValidationError({name: 'Expected a number.'})
+            # Decimal() also accepts NaN and Infinity, which the database can't compare
+            if not filters[name].is_finite():
+                raise serializers.ValidationError({name: 'Expected a number.'})
+
+    if params.get('in_stock', '').lower() in TRUE_VALUES:
+        filters['in_stock'] = True
+
+    return filters
+
+
+def filter_products(queryset, filters, exclude=()):
+    """Apply filters to a Product queryset, skipping the dimensions listed in exclude."""
+    if 'category' in filters and 'category' not in exclude:
+        # EXISTS keeps one row per product without a DISTINCT over the M2M join
+        queryset = queryset.filter(Exists(
+            Product.categories.through.objects.filter(
+                product_id=OuterRef('pk'),
+                category_id__in=filters['category'],
+            )
+        ))
+    if 'price' not in exclude:
+        if 'min_price' in filters:
+            queryset = queryset.filter(price__gte=filters['min_price'])
+        if 'max_price' in filters:
+            queryset = queryset.filter(price__lte=filters['max_price'])
+    if filters.get('in_stock') and 'in_stock' not in exclude:
+        queryset = queryset.filter(stock_quantity__gt=0)
+    return queryset
+
+
+def cache_params(filters):
+    return {
+        name: ','.join(map(str, value)) if isinstance(value, list) else value
+        for name, value in filters.items()
+    }
+
+
+def compute_facet_counts(filters):
+    """
+    Category and price-bucket counts. Each facet is counted over the products
+    matching every *other* filter, so selecting a category still shows the
+    counts of its sibling categories.
+    """
+    category_products = filter_products(Product.objects.all(), filters, exclude=('category',))
+    category_counts = (
+        Product.categories.through.objects
+        .filter(product__in=category_products)
+        .values('category_id', 'category__name')
+        .annotate(count=Count('product_id'))
+        .order_by('category__name')
+    )
+
+    buckets = get_price_buckets()
+    price_products = filter_products(Product.objects.all(), filters, exclude=('price',))
+    aggregates = {}
+    for i, (lower, upper) in enumerate(buckets):
+        condition = Q(price__gte=lower)
+        if upper is not None:
+            condition &= Q(price__lt=upper)
+        aggregates[f'bucket_{i}'] = Count('id', filter=condition)
+    bucket_counts = price_products.aggregate(**aggregates)
+
+    return {
+        'categories': [
+            {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+            for row in category_counts
+        ],
+        'price': [
+            {
+                'min': str(lower),
+                'max': str(upper) if upper is not None else None,
+                'count': bucket_counts[f'bucket_{i}'],
+            }
+            for i, (lower, upper) in enumerate(buckets)
+        ],
+    }
+
+
+def get_facet_counts(filters):
+    """Facet counts, computed once per catalog version and filter combination."""
+    cache_key = catalog_cache_key('facets', **cache_params(filters))
+    facets = get_cached_payload(cache_key)
+    if facets is None:
+        facets = compute_facet_counts(filters)
+        set_cached_payload(cache_key, facets)
+    return facets
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps
+
+from .cache import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Rendition name -> maximum width in pixels (images are never upscaled)
+RENDITIONS = {
+    'thumbnail': 200,
+    'card': 600,
+    'full': 1200,
+}
+
+# Output format -> (Pillow format, file extension, save options)
+RENDITION_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 70, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 70, 'method': 4}),
+}
+
+RENDITION_DIR = 'uploads/products/renditions'
+
+# Served as the product's `image` once built: 1200px JPEG, like the old in-place compression
+DISPLAY_RENDITION = ('full', 'jpeg')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PRODUCT_IMAGE_WORKERS,
+                thread_name_prefix='product-images',
+            )
+        return _executor
+
+
+def schedule_renditions(product_id):
+    """Build renditions off the request thread (inline when PRODUCT_IMAGE_WORKERS is 0)."""
+    if getattr(settings, 'PRODUCT_IMAGE_WORKERS', 0) > 0:
+        get_executor().submit(_build_renditions_in_worker, product_id)
+    else:
+        build_renditions(product_id)
+
+
+def _build_renditions_in_worker(product_id):
+    try:
+        build_renditions(product_id)
+    except Exception:
+        logger.exception(f"Image renditions failed for product {product_id}")
+    finally:
+        # Worker threads get their own connection; don't leak it
+        connection.close()
+
+
+def rendition_path(digest, name, extension):
+    return f'{RENDITION_DIR}/{digest[:20]}_{name}.{extension}'
+
+
+def resize(img, width):
+    if img.width <= width:
+        return img
+    height = int(img.height * width / float(img.width))
+    return img.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def encode(img, pil_format, options):
+    output = BytesIO()
+    img.save(output, format=pil_format, **options)
+    return output.getvalue()
+
+
+def build_renditions(product_id):
+    product = Product.objects.filter(pk=product_id).only('id', 'image', 'image_hash', 'image_renditions').first()
+    if product is None or not product.image:
+        return
+
+    with product.image.open('rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == product.image_hash and product.image_renditions:
+        # Same bytes re-uploaded: content-addressed renditions already exist
+        return
+
+    img = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    renditions = {}
+    for name, width in RENDITIONS.items():
+        renditions[name] = {}
+        resized = None
+        for format_name, (pil_format, extension, options) in RENDITION_FORMATS.items():
+            path = rendition_path(digest, name, extension)
+            if not default_storage.exists(path):
+                # One resize per width, encoded in every format
+                if resized is None:
+                    resized = resize(img, width)
+                default_storage.save(path, ContentFile(encode(resized, pil_format, options)))
+            renditions[name][format_name] = path
+
+    # Only record the result if the image wasn't replaced while we were working
+    updated = Product.objects.filter(pk=product_id, image=product.image.name).update(
+        image_hash=digest,
+        image_renditions=renditions,
+    )
+    if updated:
+        bump_catalog_version()
+
+
+def display_image(product):
+    """Storage name to serve as the product image: the compressed rendition once built, else the upload."""
+    name, format_name = DISPLAY_RENDITION
+    path = (product.image_renditions or {}).get(name, {}).get(format_name)
+    if path:
+        return path
+    return product.image.name if product.image else None
+
+
+def display_image_url(product, request=None):
+    path = display_image(product)
+    if not path:
+        return None
+    url = default_storage.url(path)
+    return request.build_absolute_uri(url) if request else url
+
+
+def rendition_urls(product):
+    return {
+        name: {format_name: default_storage.url(path) for format_name, path in formats.items()}
+        for name, formats in (product.image_renditions or {}).items()
+    }
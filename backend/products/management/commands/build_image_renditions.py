@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from products.images import build_renditions
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Build image renditions for products that have an image but no renditions yet (backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Also check products that already have renditions')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(Q(image='') | Q(image__isnull=True))
+        if not options['all']:
+            products = products.filter(Q(image_hash='') | Q(image_renditions={}))
+        started = time.monotonic()
+        built = failed = 0
+        for product_id in products.order_by('id').values_list('id', flat=True).iterator():
+            try:
+                build_renditions(product_id)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Product {product_id}: {e}')
+            else:
+                built += 1
+        self.stdout.write(f'Built renditions for {built} products ({failed} failed) in {time.monotonic() - started:.2f}s')
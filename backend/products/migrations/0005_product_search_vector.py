@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:27
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# GIN indexes are Postgres-only, so they are created here instead of Meta.indexes
+# to keep the migrations runnable on SQLite (which uses the in-process fallback).
+SEARCH_INDEXES_SQL = [
+    'CREATE INDEX IF NOT EXISTS product_search_vector_gin ON products_product USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS product_name_trgm_gin ON products_product USING gin (name gin_trgm_ops)',
+]
+
+DROP_SEARCH_INDEXES_SQL = [
+    'DROP INDEX IF EXISTS product_search_vector_gin',
+    'DROP INDEX IF EXISTS product_name_trgm_gin',
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SEARCH_INDEXES_SQL:
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        """
+        UPDATE products_product p SET search_vector =
+            setweight(to_tsvector('english', coalesce(p.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT string_agg(c.name, ' ')
+                FROM products_category c
+                JOIN products_product_categories pc ON pc.category_id = c.id
+                WHERE pc.product_id = p.id
+            ), '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+        """
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_SEARCH_INDEXES_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_created_id_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 import os
 import uuid
 
@@ -23,7 +24,18 @@ class Product(models.Model):
     categories = models.ManyToManyField(Category, related_name='products')
     image_url = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to=product_image_file_path, null=True, blank=True)
+    # Filled in by products.images once the renditions of the current image are built
+    image_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Maintained by products.signals; GIN indexed on Postgres (see migration 0005)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination seeks on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -1,5 +1,6 @@
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from core.utils.pagination import KeysetPagination
 
 class CustomPagination(PageNumberPagination):
     page_size = 20
@@ -14,4 +15,10 @@ class CustomPagination(PageNumberPagination):
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'results': data
-        })
\ No newline at end of file
+        })
+
+class CatalogCursorPagination(KeysetPagination):
+    """Keyset pages for infinite scroll: no COUNT(*) and no OFFSET scan."""
+    page_size = 20
+    max_page_size = 100
+    ordering = ('created_at', 'id')
@@ -0,0 +1,161 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from difflib import get_close_matches
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Value
+
+from .cache import get_catalog_version
+from .models import Product, Category
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Same relative weights as the tsvector: name (A) > category names (B) > description (C)
+FIELD_WEIGHTS = {'name': 1.0, 'categories': 0.4, 'description': 0.2}
+
+
+def get_search_config():
+    return getattr(settings, 'PRODUCT_SEARCH_CONFIG', 'english')
+
+
+def use_database_search():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+# ==================== POSTGRES ====================
+
+def refresh_search_vectors(queryset):
+    """Recompute search_vector for every product in queryset with one UPDATE."""
+    if not use_database_search():
+        return
+    config = get_search_config()
+    category_names = (
+        Category.objects.filter(products=OuterRef('pk'))
+        .values('products')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+    queryset.update(search_vector=(
+        SearchVector('name', weight='A', config=config)
+        + SearchVector(Subquery(category_names), weight='B', config=config)
+        + SearchVector('description', weight='C', config=config)
+    ))
+
+
+def database_search(q):
+    config = get_search_config()
+    query = SearchQuery(q, search_type='websearch', config=config)
+    results = (
+        Product.objects.filter(search_vector=query)
+        .annotate(rank=SearchRank(F('search_vector'), query))
+        .order_by('-rank', 'id')
+    )
+    if results.exists():
+        return results
+
+    # Nothing matched the lexemes, probably a typo: fall back to trigram similarity.
+    # Filter with the % operator, which can use product_name_trgm_gin (a filter
+    # on the similarity() annotation can't); its cut-off is a session setting
+    threshold = getattr(settings, 'PRODUCT_SEARCH_TRIGRAM_THRESHOLD', 0.3)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, false)", [str(threshold)])
+    return (
+        Product.objects.filter(TrigramSimilar(F('name'), Value(q)))
+        .annotate(similarity=TrigramSimilarity('name', q))
+        .order_by('-similarity', 'id')
+    )
+
+
+# ==================== PURE PYTHON FALLBACK ====================
+
+class InvertedIndex:
+    """
+    In-process inverted index used when the database has no full-text search
+    (SQLite in development and tests). Scores are weighted tf-idf and every
+    query term must match; unknown terms are widened to close vocabulary
+    matches, which plays the part of the trigram fallback.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.doc_count = 0
+
+    def add(self, product_id, **fields):
+        self.doc_count += 1
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                postings = self.postings[token]
+                postings[product_id] = postings.get(product_id, 0.0) + weight
+
+    def expand(self, token):
+        if token in self.postings:
+            return [token]
+        return get_close_matches(token, self.postings.keys(), n=3, cutoff=0.75)
+
+    def search(self, q):
+        scores = None
+        for token in set(tokenize(q)):
+            term_scores = {}
+            for term in self.expand(token):
+                postings = self.postings[term]
+                idf = math.log(1 + self.doc_count / len(postings))
+                for product_id, weight in postings.items():
+                    term_scores[product_id] = term_scores.get(product_id, 0.0) + weight * idf
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        return [pid for pid, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))]
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        category_names = defaultdict(list)
+        for product_id, name in Product.categories.through.objects.values_list('product_id', 'category__name'):
+            category_names[product_id].append(name)
+        for product_id, name, description in Product.objects.values_list('id', 'name', 'description').iterator():
+            index.add(
+                product_id,
+                name=name,
+                categories=' '.join(category_names[product_id]),
+                description=description,
+            )
+        return index
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_inverted_index():
+    """Return the process-local index, rebuilding it whenever the catalog version moves."""
+    global _index, _index_version
+    version = get_catalog_version()
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = InvertedIndex.build()
+            _index_version = version
+        return _index
+
+
+def search_products(q):
+    """Ranked search results: a queryset on Postgres, a list of product ids otherwise."""
+    if use_database_search():
+        return database_search(q)
+    return get_inverted_index().search(q)
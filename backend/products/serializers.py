@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Product, Category
+from .images import display_image_url, rendition_urls
 from typing import List, Dict
 
 class SimpleCategorySerializer(serializers.ModelSerializer):
@@ -18,12 +19,28 @@ class CategorySerializer(serializers.ModelSerializer):
         products = obj.products.all()
         return SimpleProductSerializer(products, many=True).data
 
-class SimpleProductSerializer(serializers.ModelSerializer):
+class CategoryListSerializer(serializers.ModelSerializer):
+    """Lightweight category row: product_count comes from an annotation, not a query per row."""
+    product_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'description', 'product_count', 'created_at']
+
+class DisplayImageMixin:
+    """Serve the compressed display rendition as `image` once it is built."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['image'] = display_image_url(instance, self.context.get('request'))
+        return data
+
+class SimpleProductSerializer(DisplayImageMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['id', 'name', 'price', 'stock_quantity', 'image_url', 'image','description']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DisplayImageMixin, serializers.ModelSerializer):
     categories = SimpleCategorySerializer(many=True, read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         many=True, 
@@ -33,10 +50,14 @@ class ProductSerializer(serializers.ModelSerializer):
     )
     
     image = serializers.ImageField(required=False, allow_null=True)
+    image_renditions = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'description', 'price', 'stock_quantity', 
-            'categories', 'category_id', 'image_url', 'image', 'created_at'
-        ]
\ No newline at end of file
+            'categories', 'category_id', 'image_url', 'image', 'image_renditions', 'created_at'
+        ]
+    
+    def get_image_renditions(self, obj) -> Dict[str, Dict[str, str]]:
+        return rendition_urls(obj)
\ No newline at end of file
@@ -1,44 +1,77 @@
-from django.db.models.signals import pre_save
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from PIL import Image
-import os
-from .models import Product
-from io import BytesIO
-from django.core.files.base import ContentFile
-
-@receiver(pre_save, sender=Product)
-def compress_image(sender, instance, **kwargs):
-    """Compress product image before saving."""
-    if instance.image:
-        try:
-            # Open the image
-            img = Image.open(instance.image)
-            
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            
-            # Resize if too large (max width 1200px)
-            if img.width > 1200:
-                ratio = 1200 / float(img.width)
-                new_height = int(float(img.height) * float(ratio))
-                img = img.resize((1200, new_height), Image.Resampling.LANCZOS)
-            
-            # Save compressed image to memory
-            img_io = BytesIO()
-            img.save(img_io, format='JPEG', optimize=True, quality=70)
-            
-            # Generate new filename with .jpg extension
-            original_name = os.path.splitext(instance.image.name)[0]
-            new_filename = f"{original_name}.jpg"
-            
-            # Save the compressed image back to the field
-            instance.image.save(
-                new_filename,
-                ContentFile(img_io.getvalue()),
-                save=False
-            )
-            
-        except Exception as e:
-            # If compression fails, continue with original image
-            print(f"Image compression failed: {e}")
\ No newline at end of file
+from .models import Product, Category
+from .cache import bump_catalog_version
+from .search import refresh_search_vectors, use_database_search
+from .images import schedule_renditions
+
+def get_raw_image_name(instance):
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value) or None
+
+
+@receiver(post_init, sender=Product)
+def remember_original_image(sender, instance, **kwargs):
+    # Raw column value: reading instance.image would load a deferred field
+    instance._original_image_name = get_raw_image_name(instance)
+
+
+@receiver(post_save, sender=Product)
+def queue_image_renditions(sender, instance, created, **kwargs):
+    """Build renditions only when a new image was uploaded, never on plain saves."""
+    image_name = get_raw_image_name(instance)
+    if image_name and image_name != instance._original_image_name:
+        product_id = instance.pk
+        transaction.on_commit(lambda: schedule_renditions(product_id))
+    instance._original_image_name = image_name
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Any catalog write makes cached product payloads stale."""
+    # After commit, so a concurrent reader can't cache the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def invalidate_catalog_cache_on_categories_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, **kwargs):
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(Product.objects.filter(categories=instance))
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_products(sender, instance, **kwargs):
+    if use_database_search():
+        instance._search_product_ids = list(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def update_search_vectors_after_category_delete(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_search_product_ids', None)
+    if product_ids:
+        refresh_search_vectors(Product.objects.filter(pk__in=product_ids))
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def update_search_vectors_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+    elif pk_set:
+        refresh_search_vectors(Product.objects.filter(pk__in=pk_set))
@@ -0,0 +1,261 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from .cache import (
+    CATALOG_VERSION_KEY, bump_catalog_version, get_catalog_cache_stats, get_catalog_version,
+    reset_catalog_cache_stats,
+)
+from .images import RENDITIONS
+from .models import Category, Product
+
+
+def create_product(name='Mug', price=100, stock_quantity=5, **fields):
+    fields.setdefault('description', name)
+    return Product.objects.create(name=name, price=price, stock_quantity=stock_quantity, **fields)
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_catalog_cache_stats()
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def test_second_read_is_a_hit(self):
+        product = create_product()
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(f'/api/products/{product.pk}/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(f'/api/products/{product.pk}/')['X-Cache'], 'HIT')
+
+        stats = get_catalog_cache_stats()
+        # The list's facet counts are cached under their own key
+        self.assertEqual((stats['hits'], stats['misses']), (2, 3))
+
+    def test_writes_invalidate_after_commit(self):
+        product = create_product()
+        self.client.get(f'/api/products/{product.pk}/')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.name = 'Cup'
+            product.save()
+        # Not bumped until the transaction commits
+        self.assertEqual(self.client.get(f'/api/products/{product.pk}/')['X-Cache'], 'HIT')
+
+        for callback in callbacks:
+            callback()
+        response = self.client.get(f'/api/products/{product.pk}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['name'], 'Cup')
+
+    def test_evicted_version_is_not_reused(self):
+        version = get_catalog_version()
+        cache.delete(CATALOG_VERSION_KEY)
+        self.assertGreater(get_catalog_version(), version)
+
+    def test_bump_replaces_the_version(self):
+        version = get_catalog_version()
+        cache.set(CATALOG_VERSION_KEY, 'corrupt', None)
+        self.assertGreater(bump_catalog_version(), version)
+        self.assertEqual(get_catalog_version(), cache.get(CATALOG_VERSION_KEY))
+
+
+class CatalogPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(25):
+            create_product(f'Product {index}')
+        # Ties on created_at must still page by id without repeats or gaps
+        Product.objects.filter(id__lte=Product.objects.order_by('id')[10].id).update(created_at=timezone.now())
+
+    def test_cursor_pages_are_stable(self):
+        seen = []
+        params = {'pagination': 'cursor', 'page_size': 7}
+        while True:
+            data = self.client.get('/api/products/', params).data
+            self.assertNotIn('count', data)
+            seen += [product['id'] for product in data['results']]
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        expected = list(Product.objects.order_by('created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', 'WzFd'):
+            response = self.client.get('/api/products/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('cursor', response.data)
+
+    def test_page_numbers_without_cursor(self):
+        data = self.client.get('/api/products/', {'page': 2, 'page_size': 10}).data
+        self.assertEqual((data['count'], data['total_pages'], data['current_page']), (25, 3, 2))
+        self.assertEqual(len(data['results']), 10)
+
+
+class ProductSearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        kitchen = Category.objects.create(name='Kitchen')
+        self.mug = create_product('Coffee Mug')
+        self.mug.categories.add(kitchen)
+        self.cup = create_product('Tea Cup', description='Pairs well with a coffee mug')
+        create_product('Desk Lamp')
+
+    def search(self, q):
+        response = self.client.get('/api/products/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [product['id'] for product in response.data['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('coffee mug'), [self.mug.id, self.cup.id])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('kitchen mug'), [self.mug.id])
+        self.assertEqual(self.search('kitchen lamp'), [])
+
+    def test_typos_still_match(self):
+        self.assertEqual(self.search('lampp'), [Product.objects.get(name='Desk Lamp').id])
+
+    def test_index_follows_catalog_writes(self):
+        self.search('mug')
+        with self.captureOnCommitCallbacks(execute=True):
+            kettle = create_product('Kettle')
+        self.assertEqual(self.search('kettle'), [kettle.id])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get('/api/products/search/').status_code, 400)
+
+
+class ProductFilterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kitchen = Category.objects.create(name='Kitchen')
+        self.office = Category.objects.create(name='Office')
+        self.mug = create_product('Mug', price=200)
+        self.mug.categories.add(self.kitchen)
+        self.kettle = create_product('Kettle', price=1500, stock_quantity=0)
+        self.kettle.categories.add(self.kitchen)
+        self.lamp = create_product('Lamp', price=700)
+        self.lamp.categories.add(self.office)
+
+    def list(self, **params):
+        response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_filters_combine(self):
+        ids = lambda data: [product['id'] for product in data['results']]
+        self.assertEqual(ids(self.list(category=self.kitchen.id)), [self.mug.id, self.kettle.id])
+        self.assertEqual(ids(self.list(category=f'{self.kitchen.id},{self.office.id}', max_price='1000')), [self.mug.id, self.lamp.id])
+        self.assertEqual(ids(self.list(min_price='500', in_stock='true')), [self.lamp.id])
+
+    def test_facets_ignore_their_own_filter(self):
+        facets = self.list(category=self.kitchen.id, min_price='1000')['facets']
+        # Category counts apply the price filter only; price counts apply the category filter only
+        self.assertEqual(
+            [(row['name'], row['count']) for row in facets['categories']],
+            [('Kitchen', 1)],
+        )
+        self.assertEqual([row['count'] for row in facets['price']], [1, 0, 1, 0, 0])
+
+    def test_invalid_numbers_are_rejected(self):
+        for value in ('abc', 'NaN', 'Infinity', '-inf'):
+            response = self.client.get('/api/products/', {'min_price': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('min_price', response.data)
+        self.assertEqual(self.client.get('/api/products/', {'category': 'x'}).status_code, 400)
+
+
+class CategoryListTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.categories = [Category.objects.create(name=f'Category {index}') for index in range(3)]
+        for index in range(4):
+            product = create_product(f'Product {index}')
+            product.categories.add(self.categories[0])
+        create_product('Lamp').categories.add(self.categories[1])
+
+    def test_rows_have_counts_and_no_products_by_default(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/products/categories/').data
+        self.assertEqual([row['product_count'] for row in data], [4, 1, 0])
+        self.assertNotIn('products', data[0])
+
+    def test_preview_has_newest_products_per_category(self):
+        # Still two queries however many categories there are
+        for extra in range(2):
+            with self.assertNumQueries(2):
+                data = self.client.get('/api/products/categories/', {'preview': 2}).data
+            self.assertEqual(len(data), 3 + extra)
+            Category.objects.create(name=f'Extra {extra}')
+        self.assertEqual([product['name'] for product in data[0]['products']], ['Product 3', 'Product 2'])
+        self.assertEqual(set(data[0]['products'][0]), {'id', 'name', 'price', 'stock_quantity', 'image_url', 'image', 'description'})
+        self.assertEqual([product['name'] for product in data[1]['products']], ['Lamp'])
+        self.assertEqual(data[2]['products'], [])
+
+    def test_invalid_preview_is_rejected(self):
+        self.assertEqual(self.client.get('/api/products/categories/', {'preview': 'x'}).status_code, 400)
+
+
+def image_upload(width=2000, height=1000):
+    output = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(output, format='PNG')
+    return SimpleUploadedFile('photo.png', output.getvalue(), content_type='image/png')
+
+
+@override_settings(PRODUCT_IMAGE_WORKERS=0)
+class ProductImageTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_product(image=image_upload())
+
+    def test_upload_builds_renditions_with_one_resize_per_width(self):
+        with mock.patch.object(Image.Image, 'resize', autospec=True, side_effect=Image.Image.resize) as resize:
+            product = self.upload()
+        self.assertEqual(resize.call_count, len(RENDITIONS))
+
+        product.refresh_from_db()
+        self.assertEqual(set(product.image_renditions), set(RENDITIONS))
+        with product.image.storage.open(product.image_renditions['card']['webp']) as file:
+            self.assertEqual(Image.open(file).size, (600, 300))
+
+    def test_image_is_served_compressed(self):
+        product = self.upload()
+        data = self.client.get(f'/api/products/{product.pk}/').data
+        self.assertTrue(data['image'].endswith('_full.jpg'))
+        self.assertEqual(data['image'], data['image_renditions']['full']['jpeg'])
+
+    def test_plain_saves_do_not_rebuild(self):
+        product = self.upload()
+        with mock.patch('products.signals.schedule_renditions') as schedule, self.captureOnCommitCallbacks(execute=True):
+            product.stock_quantity = 3
+            product.save()
+        schedule.assert_not_called()
+
+    def test_command_backfills_existing_products(self):
+        product = self.upload()
+        Product.objects.filter(pk=product.pk).update(image_hash='', image_renditions={})
+        out = StringIO()
+        call_command('build_image_renditions', stdout=out)
+        self.assertIn('Built renditions for 1 products', out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(set(product.image_renditions), set(RENDITIONS))
@@ -1,11 +1,14 @@
 from django.urls import path
-from .views import (ProductListView, ProductDetailView, CategoryListView, CategoryDetailView, CategoryProductsView
+from .views import (ProductListView, ProductDetailView, CategoryListView, CategoryDetailView, CategoryProductsView,
+    CatalogCacheStatsView, ProductSearchView
 )
 
 urlpatterns = [
     path('', ProductListView.as_view(), name='product-list'),
+    path('search/', ProductSearchView.as_view(), name='product-search'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category-detail'),
     path('categories/<int:pk>/products/', CategoryProductsView.as_view(), name='category-products'),
+    path('cache-stats/', CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
 ]
\ No newline at end of file
@@ -3,9 +3,15 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
-from .pagination import CustomPagination
+from .serializers import ProductSerializer, CategorySerializer, CategoryListSerializer, SimpleProductSerializer
+from .pagination import CustomPagination, CatalogCursorPagination
+from .search import search_products
+from .filters import parse_product_filters, filter_products, get_facet_counts, cache_params
+from .cache import catalog_cache_key, get_cached_payload, set_cached_payload, get_catalog_cache_stats
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
 
 class ProductListView(APIView):
     serializer_class = ProductSerializer
@@ -16,14 +22,40 @@ class ProductListView(APIView):
             return [AllowAny()]
         return [IsAuthenticated()]
     
+    def get_paginator(self, request):
+        # ?pagination=cursor (or any cursor) switches to keyset pages without COUNT/OFFSET
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            return CatalogCursorPagination()
+        return self.pagination_class()
+    
     def get(self, request):
-        products = Product.objects.all().order_by('created_at')
+        paginator = self.get_paginator(request)
+        if isinstance(paginator, CatalogCursorPagination):
+            position = {'cursor': request.query_params.get(paginator.cursor_query_param, '')}
+        else:
+            position = {'page': request.query_params.get(paginator.page_query_param, 1)}
+        filters = parse_product_filters(request.query_params)
+        cache_key = catalog_cache_key(
+            'list',
+            host=request.get_host(),
+            page_size=paginator.get_page_size(request),
+            **position,
+            **cache_params(filters)
+        )
+        payload = get_cached_payload(cache_key)
+        if payload is not None:
+            return Response(payload, headers={'X-Cache': 'HIT'})
         
-        paginator = self.pagination_class()
+        products = filter_products(Product.objects.all(), filters)
+        products = products.order_by('created_at', 'id').prefetch_related('categories')
         result_page = paginator.paginate_queryset(products, request)
         serializer = ProductSerializer(result_page, many=True)
         
-        return paginator.get_paginated_response(serializer.data)
+        response = paginator.get_paginated_response(serializer.data)
+        response.data['facets'] = get_facet_counts(filters)
+        set_cached_payload(cache_key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
     
     def post(self, request):
         if not request.user.is_admin:
@@ -38,6 +70,33 @@ class ProductListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class ProductSearchView(APIView):
+    serializer_class = ProductSerializer
+    pagination_class = CustomPagination
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Ranked full-text search over product name, categories and description"""
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return Response(
+                {'error': 'Search query "q" is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = search_products(q)
+        paginator = self.pagination_class()
+        if isinstance(results, list):
+            # Fallback index returns ranked ids; load just this page and keep the rank order
+            page_ids = paginator.paginate_queryset(results, request)
+            products = Product.objects.prefetch_related('categories').in_bulk(page_ids)
+            result_page = [products[pk] for pk in page_ids if pk in products]
+        else:
+            result_page = paginator.paginate_queryset(results.prefetch_related('categories'), request)
+        
+        serializer = ProductSerializer(result_page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
 class ProductDetailView(APIView):
     serializer_class = ProductSerializer
     
@@ -50,9 +109,15 @@ class ProductDetailView(APIView):
         return get_object_or_404(Product, pk=pk)
     
     def get(self, request, pk):
+        cache_key = catalog_cache_key('detail', pk=pk)
+        payload = get_cached_payload(cache_key)
+        if payload is not None:
+            return Response(payload, status=status.HTTP_200_OK, headers={'X-Cache': 'HIT'})
+        
         product = self.get_object(pk)
         serializer = ProductSerializer(product)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        set_cached_payload(cache_key, serializer.data)
+        return Response(serializer.data, status=status.HTTP_200_OK, headers={'X-Cache': 'MISS'})
     
     def put(self, request, pk):
         if not request.user.is_admin:
@@ -88,9 +153,51 @@ class CategoryListView(APIView):
         return [IsAuthenticated()]
     
     def get(self, request):
-        categories = Category.objects.all()  # No pagination for categories
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # No pagination for categories. The full product embed is opt-in (?embed=products)
+        if request.query_params.get('embed') == 'products':
+            categories = Category.objects.prefetch_related('products')
+            serializer = CategorySerializer(categories, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        
+        categories = Category.objects.annotate(product_count=Count('products')).order_by('id')
+        data = CategoryListSerializer(categories, many=True).data
+        
+        try:
+            preview = int(request.query_params.get('preview', 0))
+        except ValueError:
+            return Response(
+                {'error': 'preview must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        preview = min(preview, getattr(settings, 'CATEGORY_PREVIEW_MAX', 20))
+        if preview > 0:
+            previews = self.get_previews([row['id'] for row in data], preview)
+            for row in data:
+                row['products'] = previews.get(row['id'], [])
+        
+        return Response(data, status=status.HTTP_200_OK)
+    
+    def get_previews(self, category_ids, limit):
+        """Newest `limit` products per category in one window-function query."""
+        rows = (
+            Product.categories.through.objects
+            .filter(category_id__in=category_ids)
+            .annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F('category_id'),
+                order_by=[F('product__created_at').desc(), F('product_id').desc()],
+            ))
+            .filter(row_number__lte=limit)
+            .select_related('product')
+            .order_by('category_id', 'row_number')
+        )
+        previews = {}
+        for row in rows:
+            previews.setdefault(row.category_id, []).append(row.product)
+        return {
+            category_id: SimpleProductSerializer(products, many=True).data
+            for category_id, products in previews.items()
+        }
     
     def post(self, request):
         if not request.user.is_admin:
@@ -168,4 +275,17 @@ class CategoryProductsView(APIView):
         category = get_object_or_404(Category, pk=pk)
         product_ids = request.data.get('product_ids', [])
         category.products.set(product_ids)
-        return Response({"message": "Products updated successfully"})
\ No newline at end of file
+        return Response({"message": "Products updated successfully"})
+
+
+class CatalogCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Catalog cache version and hit/miss counters (admin only)"""
+        if not request.user.is_admin:
+            return Response(
+                {'error': 'Admin privileges required'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(get_catalog_cache_stats())
@@ -6,7 +6,6 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -14,6 +13,9 @@ from django.db import transaction
 from django.utils import timezone
 
 from .models import Address, PasswordReset
+from core.outbox import enqueue_email
+from adminpanel.revocation import revoke_user_tokens
+from adminpanel.serializers import MyTokenObtainPairSerializer
 from .serializers import AddressSerializer, ForgotPasswordSerializer, ResetPasswordSerializer, ResendOTPSerializer, ChangePasswordSerializer
 
 from datetime import timedelta
@@ -147,13 +149,11 @@ class ForgotPasswordView(APIView):
         html_message = render_to_string('emails/password_reset.html', context)
         plain_message = strip_tags(html_message)
         
-        send_mail(
+        enqueue_email(
             'Password Reset Request - Your OTP Code',
             plain_message,
-            settings.DEFAULT_FROM_EMAIL,
             [user.email],
             html_message=html_message,
-            fail_silently=False,
         )
 
 class ResetPasswordView(APIView):
@@ -196,6 +196,7 @@ class ResetPasswordView(APIView):
             # Update user password
             user.set_password(new_password)
             user.save()
+            revoke_user_tokens(user)
             
             # Mark reset as used
             password_reset.is_used = True
@@ -282,16 +283,14 @@ class ResendOTPView(APIView):
             'expiry_minutes': 15
         }
         
-        html_message = render_to_string('templates/emails/password_reset_otp.html', context)
+        html_message = render_to_string('emails/password_reset.html', context)
         plain_message = strip_tags(html_message)
         
-        send_mail(
+        enqueue_email(
             'Your New OTP Code',
             plain_message,
-            settings.DEFAULT_FROM_EMAIL,
             [user.email],
             html_message=html_message,
-            fail_silently=False,
         )
 
 
@@ -319,12 +318,26 @@ class ChangePasswordView(APIView):
             # Optional: Invalidate other sessions (except current one)
             self.invalidate_other_sessions(user, request)
             
+            # Log out every device, then keep this one signed in with a fresh pair
+            revoke_user_tokens(user)
+            refresh = MyTokenObtainPairSerializer.get_token(user)
+            
             # Send confirmation email
             self.send_password_changed_email(user)
             
-            return Response({
-                "message": "Password changed successfully."
+            response = Response({
+                "message": "Password changed successfully.",
+                "access": str(refresh.access_token),
             }, status=status.HTTP_200_OK)
+            response.set_cookie(
+                key=settings.SIMPLE_JWT['AUTH_COOKIE_REFRESH'],
+                value=str(refresh),
+                httponly=True,
+                secure=settings.SIMPLE_JWT['AUTH_COOKIE_SECURE'],
+                samesite=settings.SIMPLE_JWT['AUTH_COOKIE_SAMESITE'],
+                max_age=settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds(),
+            )
+            return response
             
         except Exception as e:
             logger.error(f"Password change error: {e}")
@@ -363,13 +376,11 @@ class ChangePasswordView(APIView):
             html_message = render_to_string('emails/password_changed.html', context)
             plain_message = strip_tags(html_message)
             
-            send_mail(
+            enqueue_email(
                 'Password Changed Successfully',
                 plain_message,
-                getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com'),
                 [user.email],
                 html_message=html_message,
-                fail_silently=True,  # Silent fail for non-critical email
             )
         except Exception as e:
             logger.error(f"Password change email error: {e}")
\ No newline at end of file
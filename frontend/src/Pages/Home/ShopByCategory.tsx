@@ -74,7 +74,7 @@ const ShopByCategory = () => {
         setIsLoading(true);
         setError(null);
         // Fetch all categories, assuming each comes with its products nested
-        const response = await api.get<Category[]>('/api/products/categories/');
+        const response = await api.get<Category[]>('/api/products/categories/?embed=products');
         setCategories(response.data);
 
         // Set the first category as the default selected one
@@ -180,7 +180,7 @@ const ProductsPage = () => {
       try {
         setIsLoading(true);
         setError(null);
-        const response = await api.get<CategoryResponse[]>("/api/products/categories/");
+        const response = await api.get<CategoryResponse[]>("/api/products/categories/?embed=products");
         setCategories(response.data);
       } catch (err) {
         console.error("Failed to fetch categories:", err);